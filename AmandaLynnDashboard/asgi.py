@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AmandaLynnDashboard.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Imported once the app registry is ready.
+from backend.events import route_events  # noqa: E402
+from backend.offload import StreamingASGIHandler  # noqa: E402
+
+application = route_events(StreamingASGIHandler())
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -56,7 +57,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'backend.profiling.ProfilingMiddleware',
+    'backend.stores.StoreMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -117,13 +120,107 @@ LOGGING = {
 # Provide a default name if not set
 dbname = os.getenv('DATABASE_NAME', 'dev.sqlite3')
 
+# Graphs, product comparisons and exports read through a separate read-only
+# connection (see backend.routers). By default it opens the live database
+# file, where its reads still take the shared locks that hold up writes; set
+# ANALYTICS_SNAPSHOT to a path to read from a copy refreshed by
+# `python manage.py refresh_analytics_snapshot` instead. Only the snapshot
+# keeps long reports from locking out the register's writes.
+ANALYTICS_SNAPSHOT = os.getenv('ANALYTICS_SNAPSHOT')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': f"/app/{dbname}",
-    }
+    },
+    'analytics': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{ANALYTICS_SNAPSHOT or f'/app/{dbname}'}?mode=ro",
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+# Extra shop locations, each with its own database file next to the main
+# one (e.g. STORES=north,harbour gives /app/north-dev.sqlite3). Requests pick
+# a store with an X-Store header or a /stores/<name>/ URL prefix; without
+# either they use the main database (see backend.stores).
+STORES = [s.strip().lower() for s in os.getenv('STORES', '').split(',') if s.strip()]
+
+for store in STORES:
+    DATABASES[f'store_{store}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"/app/{store}-{dbname}",
+    }
+    DATABASES[f'store_{store}_analytics'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:/app/{store}-{dbname}?mode=ro",
+        'TEST': {
+            'MIRROR': f'store_{store}',
+        },
+    }
+
+DATABASE_ROUTERS = ['backend.routers.AnalyticsRouter']
+
+# Application server used by `python manage.py serve`. SERVER_MODE is one of
+# 'runserver' (Django's single-process development server), 'asgi' (gunicorn
+# managing uvicorn workers) or 'wsgi' (gunicorn threaded workers).
+SERVER_MODE = os.getenv('SERVER_MODE', 'runserver')
+SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', os.cpu_count() or 1))
+SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4))
+SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 120))
+
+# Threads per process that graph and export work is offloaded to.
+OFFLOAD_THREADS = int(os.getenv('OFFLOAD_THREADS', 4))
+
+# Identical concurrent graph and export requests share one computation (see
+# backend.singleflight). Results are handed between worker processes
+# through files in this directory.
+SINGLEFLIGHT_DIR = os.getenv(
+    'SINGLEFLIGHT_DIR', os.path.join(tempfile.gettempdir(), 'amandalynn-singleflight'))
+
+# Per-request profiling (see backend.profiling). Off by default; when on, a
+# request with an `X-Profile: 1` header or `?profile=true` is profiled and
+# the newest PROFILING_KEEP reports are listed at /api/debug/profiles/.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+PROFILING_DIR = os.getenv(
+    'PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'amandalynn-profiles'))
+PROFILING_KEEP = int(os.getenv('PROFILING_KEEP', 50))
+
+# Online backups (see backend.backups), taken by POST /api/save/ and
+# `python manage.py backup_database`. Pages are copied in steps of
+# BACKUP_PAGES_PER_STEP with a BACKUP_STEP_SLEEP second pause between them
+# so writers are never held up for long. A write from another connection
+# between steps restarts the copy; after BACKUP_MAX_RESTARTS of those the
+# rest is copied in one step. The newest BACKUP_KEEP backups are kept, plus
+# the newest of each day for BACKUP_KEEP_DAILY days.
+BACKUP_DIR = os.getenv('BACKUP_DIR', '/app/backups')
+BACKUP_COMPRESS = os.getenv('BACKUP_COMPRESS', 'false').lower() == 'true'
+BACKUP_KEEP = int(os.getenv('BACKUP_KEEP', 10))
+BACKUP_KEEP_DAILY = int(os.getenv('BACKUP_KEEP_DAILY', 14))
+BACKUP_PAGES_PER_STEP = int(os.getenv('BACKUP_PAGES_PER_STEP', 256))
+BACKUP_STEP_SLEEP = float(os.getenv('BACKUP_STEP_SLEEP', 0.005))
+BACKUP_MAX_RESTARTS = int(os.getenv('BACKUP_MAX_RESTARTS', 10))
+
+# Database upkeep (see backend.maintenance): `python manage.py
+# maintain_database`, and once a day from `serve` when MAINTENANCE_WINDOW
+# gives quiet hours such as '3-5'. Free pages are returned in at most
+# MAINTENANCE_VACUUM_STEPS steps of MAINTENANCE_VACUUM_PAGES pages.
+MAINTENANCE_WINDOW = os.getenv('MAINTENANCE_WINDOW', '')
+MAINTENANCE_VACUUM_PAGES = int(os.getenv('MAINTENANCE_VACUUM_PAGES', 500))
+MAINTENANCE_VACUUM_STEPS = int(os.getenv('MAINTENANCE_VACUUM_STEPS', 100))
+MAINTENANCE_STEP_SLEEP = float(os.getenv('MAINTENANCE_STEP_SLEEP', 0.05))
+
+# Processes rendering the formats of a `format=bundle` export side by side
+# (reportlab and python-docx hold the GIL, so threads would not help).
+EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS', min(3, os.cpu_count() or 1)))
+
+# Low-stock alerts: a product is flagged once its stock covers no more than
+# REORDER_LEAD_DAYS + REORDER_SAFETY_DAYS of sales at its recent velocity.
+REORDER_LEAD_DAYS = int(os.getenv('REORDER_LEAD_DAYS', 14))
+REORDER_SAFETY_DAYS = int(os.getenv('REORDER_SAFETY_DAYS', 7))
+
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
 
@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import Product, Expense, Transaction, TransactionProduct
+from .models import (
+    Product, Expense, Transaction, TransactionProduct,
+    ArchivedExpense, ArchivedTransaction, DailyProductSales, ProductVelocity
+)
 
 admin.site.register(Product)
 admin.site.register(Expense)
 admin.site.register(Transaction)
 admin.site.register(TransactionProduct)
+admin.site.register(ArchivedExpense)
+admin.site.register(ArchivedTransaction)
+admin.site.register(DailyProductSales)
+admin.site.register(ProductVelocity)
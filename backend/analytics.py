@@ -0,0 +1,489 @@
+"""
+Trend analytics for the graph endpoint.
+
+Income, expense and product sales are loaded once per request as dense
+NumPy arrays (one slot per month or day, zero-filled) and every statistic
+is computed on whole arrays at a time. For all stores at once, each
+store's arrays are loaded in parallel and summed.
+"""
+from datetime import date
+from itertools import chain
+
+from django.db.models import BigIntegerField, IntegerField, Sum, Value
+from django.db.models.functions import Length, Replace, Substr
+import numpy as np
+
+from .models import Product, Expense, Transaction
+from . import archive
+from . import stores
+
+# Length of the 'YYYY-MM-DD' prefix grouped on, and the numpy unit it maps to.
+GRANULARITIES = {
+    'month': (7, 'M'),
+    'day': (10, 'D'),
+}
+
+# Periods in a year, for year-over-year comparisons.
+YEAR_LAG = {'month': 12, 'day': 365}
+
+DEFAULT_WINDOW = {'month': 3, 'day': 7}
+DEFAULT_TOP_TYPES = 5
+DEFAULT_HORIZON = {'month': 6, 'day': 30}
+
+METRICS = ['revenue', 'loss', 'profit', 'product_sales']
+
+COLORS = ['#42A5F5', '#FF6384', '#4BC0C0', '#FFCE56', '#36A2EB', '#9966FF', '#FF9F40']
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+class Series:
+    def __init__(self, granularity, periods, values):
+        self.granularity = granularity
+        # datetime64 array of consecutive periods
+        self.periods = periods
+        # {name: float array aligned with periods}
+        self.values = values
+
+    @property
+    def labels(self):
+        return self.periods.astype(str).tolist()
+
+
+def _str_param(params, name, default):
+    # Request bodies are JSON, so a parameter may be any JSON value.
+    value = params.get(name, default)
+    if not isinstance(value, str):
+        raise ValueError(f'{name} must be a string')
+    return value
+
+
+def parse_range(params):
+    """Validated (granularity, start, end) from graph request parameters."""
+    granularity = _str_param(params, 'granularity', 'month')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f'Invalid granularity: {granularity}')
+    try:
+        start = date.fromisoformat(params['start']) if params.get('start') else None
+        end = date.fromisoformat(params['end']) if params.get('end') else None
+    except (TypeError, ValueError):
+        raise ValueError('start and end must be dates formatted YYYY-MM-DD')
+    if start and end and end < start:
+        raise ValueError('end must not be before start')
+    return granularity, start, end
+
+
+def filter_range(queryset, start, end):
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    return queryset
+
+
+def timeline(granularity, start, end, observed):
+    """
+    Consecutive periods covering the requested range, or the observed
+    periods when the range is open-ended.
+    """
+    unit = GRANULARITIES[granularity][1]
+    first = np.datetime64(start, unit) if start else observed.min()
+    last = np.datetime64(end, unit) if end else observed.max()
+    return np.arange(first, last + 1, dtype=f'datetime64[{unit}]')
+
+
+def merge_series(parts):
+    """Sum Series loaded from several stores onto one covering period axis."""
+    loaded = [part for part in parts if len(part.periods)]
+    if not loaded:
+        return parts[0]
+    unit = GRANULARITIES[loaded[0].granularity][1]
+    axis = np.arange(min(part.periods[0] for part in loaded),
+                     max(part.periods[-1] for part in loaded) + 1,
+                     dtype=f'datetime64[{unit}]')
+    values = {}
+    for part in loaded:
+        offset = int((part.periods[0] - axis[0]).astype(int))
+        for name, series in part.values.items():
+            values.setdefault(name, np.zeros(len(axis)))[offset:offset + len(series)] += series
+    return Series(loaded[0].granularity, axis, values)
+
+
+def merge_matrices(parts):
+    merged = merge_series([Series(series.granularity, series.periods, dict(zip(types, series.values)))
+                           for types, series in parts])
+    types = sorted(merged.values)
+    matrix = np.array([merged.values[t] for t in types]).reshape(len(types), len(merged.periods))
+    return types, Series(merged.granularity, merged.periods, matrix)
+
+
+def load_money_series(granularity, start=None, end=None):
+    """Income and expense per period, from one UNION ALL query summing cents."""
+    if stores.fanning_out():
+        return merge_series(stores.fan_out(load_money_series, granularity, start, end))
+    prefix, unit = GRANULARITIES[granularity]
+    cents = BigIntegerField()
+    zero = Value(0, output_field=cents)
+
+    queries = []
+    for source in archive.sources(Transaction, start):
+        queries.append(
+            filter_range(source, start, end)
+            .annotate(period=Substr('date', 1, prefix)).values('period')
+            .annotate(income=Sum('total', output_field=cents), expense=zero)
+            .values_list('period', 'income', 'expense'))
+    for source in archive.sources(Expense, start):
+        queries.append(
+            filter_range(source, start, end)
+            .annotate(period=Substr('date', 1, prefix)).values('period')
+            .annotate(income=zero, expense=Sum('price', output_field=cents))
+            .values_list('period', 'income', 'expense'))
+    rows = list(queries[0].union(*queries[1:], all=True))
+
+    if not rows and not (start and end):
+        return Series(granularity, np.array([], dtype=f'datetime64[{unit}]'),
+                      {'income': np.zeros(0), 'expense': np.zeros(0)})
+
+    periods, income, expense = zip(*rows) if rows else ((), (), ())
+    observed = np.array(periods, dtype=f'datetime64[{unit}]')
+    axis = timeline(granularity, start, end, observed)
+    index = (observed - axis[0]).astype(int)
+    keep = (index >= 0) & (index < len(axis))
+
+    values = {}
+    for name, amounts in (('income', income), ('expense', expense)):
+        series = np.zeros(len(axis), dtype=np.int64)
+        np.add.at(series, index[keep], np.asarray(amounts, dtype=np.int64)[keep])
+        values[name] = series / 100
+    return Series(granularity, axis, values)
+
+
+def _units_sold(name):
+    # Transaction.products holds str(list), where each entry is repr(name):
+    # the number of times that token occurs is the units sold of `name`.
+    token = repr(name)
+    return Sum(
+        (Length('products') - Length(Replace('products', Value(token), Value('')))) / len(token),
+        output_field=IntegerField())
+
+
+def load_product_series(granularity, names, start=None, end=None):
+    """
+    Units sold per period for each product in `names`, counted in SQL by
+    one GROUP BY period query with a column per product.
+    """
+    if stores.fanning_out():
+        return merge_series(stores.fan_out(load_product_series, granularity, names, start, end))
+    prefix, unit = GRANULARITIES[granularity]
+    names = list(dict.fromkeys(names))
+    sold = {f'sold_{i}': _units_sold(name) for i, name in enumerate(names)}
+
+    queries = [
+        filter_range(source, start, end)
+        .annotate(period=Substr('date', 1, prefix)).values('period')
+        .annotate(**sold)
+        .values_list('period', *sold)
+        for source in archive.sources(Transaction, start)
+    ]
+    rows = list(queries[0].union(*queries[1:], all=True)) if names else []
+
+    if not rows and not (start and end):
+        return Series(granularity, np.array([], dtype=f'datetime64[{unit}]'),
+                      {name: np.zeros(0) for name in names})
+    observed = np.array([row[0] for row in rows], dtype=f'datetime64[{unit}]')
+    axis = timeline(granularity, start, end, observed)
+
+    counts = np.zeros((len(names), len(axis)))
+    if rows:
+        units = np.array([row[1:] for row in rows], dtype=float).T
+        np.add.at(counts, (slice(None), (observed - axis[0]).astype(int)), units)
+    return Series(granularity, axis, {name: counts[i] for i, name in enumerate(names)})
+
+
+def load_expense_matrix(granularity, start=None, end=None):
+    """
+    Expense totals as a (type x period) matrix, from one
+    GROUP BY type, period query. Returns (types, Series of the matrix).
+    """
+    if stores.fanning_out():
+        return merge_matrices(stores.fan_out(load_expense_matrix, granularity, start, end))
+    prefix, unit = GRANULARITIES[granularity]
+    queries = [
+        filter_range(source, start, end)
+        .annotate(period=Substr('date', 1, prefix)).values('type', 'period')
+        .annotate(amount=Sum('price', output_field=BigIntegerField()))
+        .values_list('type', 'period', 'amount')
+        for source in archive.sources(Expense, start)
+    ]
+    rows = list(queries[0].union(*queries[1:], all=True))
+    if not rows and not (start and end):
+        return [], Series(granularity, np.array([], dtype=f'datetime64[{unit}]'), np.zeros((0, 0)))
+
+    types, periods, amounts = zip(*rows) if rows else ((), (), ())
+    names, type_index = np.unique(np.array(types, dtype=str), return_inverse=True)
+    observed = np.array(periods, dtype=f'datetime64[{unit}]')
+    axis = timeline(granularity, start, end, observed)
+    period_index = (observed - axis[0]).astype(int)
+
+    matrix = np.zeros((len(names), len(axis)), dtype=np.int64)
+    np.add.at(matrix, (type_index, period_index), np.asarray(amounts, dtype=np.int64))
+    return names.tolist(), Series(granularity, axis, matrix / 100)
+
+
+def _active_products():
+    return list(Product.objects.filter(is_retired=False).values_list('name', flat=True))
+
+
+def load_metric(params):
+    """The requested metric as a Series of one or more named arrays."""
+    granularity, start, end = parse_range(params)
+    metric = _str_param(params, 'metric', 'revenue').strip().lower()
+    if metric not in METRICS:
+        raise ValueError(f'Invalid metric: {metric}')
+
+    if metric == 'product_sales':
+        products = params.get('products', 'all')
+        if isinstance(products, str):
+            products = 'all' if products.strip().lower() == 'all' else products.split(',')
+        if products == 'all' and stores.fanning_out():
+            names = list(dict.fromkeys(chain.from_iterable(stores.fan_out(_active_products))))
+        elif products == 'all':
+            names = _active_products()
+        elif isinstance(products, list) and all(isinstance(p, str) for p in products):
+            names = [p.strip() for p in products]
+        else:
+            raise ValueError("products must be 'all' or a list of product names")
+        return load_product_series(granularity, names, start, end)
+
+    money = load_money_series(granularity, start, end)
+    income, expense = money.values['income'], money.values['expense']
+    series = {'revenue': income, 'loss': expense, 'profit': income - expense}[metric]
+    return Series(granularity, money.periods, {metric.capitalize(): series})
+
+
+def rolling_mean(values, window):
+    """Trailing mean over `window` periods; NaN until the window fills."""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def year_over_year(values, lag):
+    """Absolute and relative change against the same period a year earlier."""
+    delta = np.full(len(values), np.nan)
+    percent = np.full(len(values), np.nan)
+    if len(values) > lag:
+        previous = values[:-lag]
+        delta[lag:] = values[lag:] - previous
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Against the size of the base, so a loss turning into a profit is
+            # still an increase.
+            percent[lag:] = np.where(previous != 0, delta[lag:] / np.abs(previous) * 100, np.nan)
+    return delta, percent
+
+
+def seasonality_index(periods, values):
+    """
+    Average of each calendar month (or weekday for daily series) relative
+    to the overall average; 1.0 is a typical period.
+    """
+    if periods.dtype == np.dtype('datetime64[M]'):
+        buckets = periods.astype(int) % 12
+        size = 12
+    else:
+        # 1970-01-01 was a Thursday
+        buckets = (periods.astype(int) + 3) % 7
+        size = 7
+    counts = np.bincount(buckets, minlength=size)
+    totals = np.bincount(buckets, weights=values, minlength=size)
+    overall = values.mean() if len(values) else 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((counts > 0) & (overall != 0), totals / counts / overall, np.nan)
+
+
+def linear_forecast(values, horizon):
+    if len(values) < 2:
+        return np.full(horizon, values[-1] if len(values) else np.nan)
+    slope, intercept = np.polyfit(np.arange(len(values)), values, 1)
+    return intercept + slope * np.arange(len(values), len(values) + horizon)
+
+
+def holt_forecast(values, horizon, alpha, beta):
+    """Holt's linear (double exponential smoothing) forecast."""
+    if len(values) < 2:
+        return np.full(horizon, values[-1] if len(values) else np.nan)
+    # The smoothing recurrence is inherently sequential, but only runs once
+    # per period of the series, not per transaction.
+    level, trend = values[0], values[1] - values[0]
+    for value in values[1:].tolist():
+        previous_level = level
+        level = alpha * value + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+    return level + trend * np.arange(1, horizon + 1)
+
+
+def _int_param(params, name, default, minimum=1):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name}')
+    if value < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return value
+
+
+def _float_param(params, name, default):
+    try:
+        value = float(params.get(name, default))
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid {name}')
+    if not 0 < value <= 1:
+        raise ValueError(f'{name} must be between 0 and 1')
+    return value
+
+
+def _json_values(values):
+    # NaN marks "no value" and becomes null, which chart.js leaves as a gap.
+    rounded = np.round(values, 2)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+def _dataset(label, values, color, dashed=False):
+    dataset = {
+        'label': label,
+        'data': _json_values(values),
+        'borderColor': color,
+        'backgroundColor': 'transparent',
+        'borderWidth': 2,
+        'pointRadius': 4,
+        'fill': False
+    }
+    if dashed:
+        dataset['borderDash'] = [6, 4]
+    return dataset
+
+
+def rolling_graph(params):
+    series = load_metric(params)
+    window = _int_param(params, 'window', DEFAULT_WINDOW[series.granularity])
+    datasets = []
+    for i, (name, values) in enumerate(series.values.items()):
+        color = COLORS[i % len(COLORS)]
+        datasets.append(_dataset(name, values, color))
+        datasets.append(_dataset(f'{name} ({window}-period average)',
+                                 rolling_mean(values, window), color, dashed=True))
+    return {'labels': series.labels, 'datasets': datasets}
+
+
+def yoy_graph(params):
+    series = load_metric(params)
+    lag = YEAR_LAG[series.granularity]
+    datasets = []
+    for i, (name, values) in enumerate(series.values.items()):
+        delta, percent = year_over_year(values, lag)
+        datasets.append(_dataset(f'{name} change vs previous year', delta[lag:],
+                                 COLORS[(2 * i) % len(COLORS)]))
+        datasets.append(_dataset(f'{name} % change vs previous year', percent[lag:],
+                                 COLORS[(2 * i + 1) % len(COLORS)], dashed=True))
+    return {'labels': series.labels[lag:], 'datasets': datasets}
+
+
+def cumulative_graph(params):
+    params = {'metric': 'profit', **params}
+    series = load_metric(params)
+    return {
+        'labels': series.labels,
+        'datasets': [
+            _dataset(f'Cumulative {name}', np.cumsum(values), COLORS[i % len(COLORS)])
+            for i, (name, values) in enumerate(series.values.items())
+        ]
+    }
+
+
+def seasonality_graph(params):
+    series = load_metric(params)
+    labels = MONTH_NAMES if series.granularity == 'month' else WEEKDAY_NAMES
+    return {
+        'labels': labels,
+        'datasets': [
+            _dataset(f'{name} seasonality index', seasonality_index(series.periods, values),
+                     COLORS[i % len(COLORS)])
+            for i, (name, values) in enumerate(series.values.items())
+        ]
+    }
+
+
+def forecast_graph(params):
+    series = load_metric(params)
+    horizon = _int_param(params, 'horizon', DEFAULT_HORIZON[series.granularity])
+    method = _str_param(params, 'method', 'holt')
+    if method == 'holt':
+        alpha = _float_param(params, 'alpha', 0.5)
+        beta = _float_param(params, 'beta', 0.3)
+        forecast = lambda values: holt_forecast(values, horizon, alpha, beta)  # noqa: E731
+    elif method == 'linear':
+        forecast = lambda values: linear_forecast(values, horizon)  # noqa: E731
+    else:
+        raise ValueError(f'Invalid method: {method}')
+
+    if len(series.periods):
+        future = np.arange(series.periods[-1] + 1, series.periods[-1] + 1 + horizon)
+    else:
+        future = np.array([], dtype=series.periods.dtype)
+    history = len(series.periods)
+
+    datasets = []
+    for i, (name, values) in enumerate(series.values.items()):
+        color = COLORS[i % len(COLORS)]
+        actual = np.concatenate([values, np.full(len(future), np.nan)])
+        # The forecast line starts at the last actual point so the two join.
+        predicted = np.full(history + len(future), np.nan)
+        if history:
+            predicted[history - 1] = values[-1]
+            predicted[history:] = forecast(values)
+        datasets.append(_dataset(name, actual, color))
+        datasets.append(_dataset(f'{name} forecast', predicted, color, dashed=True))
+
+    return {
+        'labels': series.labels + future.astype(str).tolist(),
+        'datasets': datasets
+    }
+
+
+def expense_breakdown_graph(params):
+    granularity, start, end = parse_range(params)
+    top = _int_param(params, 'top', DEFAULT_TOP_TYPES)
+    types, series = load_expense_matrix(granularity, start, end)
+    matrix = series.values
+
+    # Largest types overall keep their own stack; the rest share "Other".
+    order = np.argsort(-matrix.sum(axis=1), kind='stable')
+    rows = [(types[i], matrix[i]) for i in order[:top]]
+    if len(order) > top:
+        rows.append(('Other', matrix[order[top:]].sum(axis=0)))
+
+    datasets = []
+    for i, (name, values) in enumerate(rows):
+        color = COLORS[i % len(COLORS)]
+        datasets.append({
+            'label': name,
+            'data': _json_values(values),
+            'backgroundColor': color,
+            'borderColor': color,
+            'borderWidth': 1,
+            'stack': 'expenses'
+        })
+    return {'labels': series.labels, 'datasets': datasets}
+
+
+GRAPHS = {
+    'rolling': rolling_graph,
+    'yoy': yoy_graph,
+    'cumulative': cumulative_graph,
+    'seasonality': seasonality_graph,
+    'forecast': forecast_graph,
+    'expense_breakdown': expense_breakdown_graph,
+}
@@ -0,0 +1,34 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+
+
+class BackendConfig(AppConfig):
+    name = 'backend'
+
+    def ready(self):
+        from .routers import set_query_only
+        from .versioning import bump_on_write
+        from . import changelog, events, patching, stock
+        connection_created.connect(set_query_only)
+
+        for model_name in ['Product', 'Expense', 'Transaction', 'TransactionProduct',
+                           'ArchivedExpense', 'ArchivedTransaction']:
+            model = self.get_model(model_name)
+            post_save.connect(bump_on_write, sender=model)
+            post_delete.connect(bump_on_write, sender=model)
+
+        for model_name in ['Product', 'Expense', 'Transaction']:
+            model = self.get_model(model_name)
+            post_save.connect(changelog.record_change, sender=model)
+            post_delete.connect(changelog.record_change, sender=model)
+            post_save.connect(events.publish_change, sender=model)
+            post_delete.connect(events.publish_change, sender=model)
+            pre_save.connect(patching.bump_row_version, sender=model)
+
+        Product = self.get_model('Product')
+        Transaction = self.get_model('Transaction')
+        pre_save.connect(stock.remember_previous_sale, sender=Transaction)
+        post_save.connect(stock.record_sale, sender=Transaction)
+        post_delete.connect(stock.remove_sale, sender=Transaction)
+        post_save.connect(stock.product_changed, sender=Product)
@@ -0,0 +1,90 @@
+from datetime import datetime
+
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Expense, Transaction, ArchivedExpense, ArchivedTransaction
+from .changelog import require_full_sync
+from .versioning import bump_version
+from . import stores
+
+DEFAULT_BATCH_SIZE = 1000
+
+ARCHIVES = {
+    Expense: ArchivedExpense,
+    Transaction: ArchivedTransaction,
+}
+
+
+def _field_names(model):
+    return [f.attname for f in model._meta.concrete_fields]
+
+
+def archived_through(model):
+    """Latest date held in `model`'s archive table, or None if it is empty."""
+    return ARCHIVES[model].objects.aggregate(latest=Max('date'))['latest']
+
+
+def sources(model, start_date=None):
+    """
+    Querysets that together hold every `model` row dated on or after
+    `start_date` (all rows when it is None).
+
+    The archive table is only included when the range reaches back into it,
+    so queries over recent data keep hitting the hot table alone.
+    """
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    querysets = [model.objects.all()]
+    latest = archived_through(model)
+    if latest is not None and (start_date is None or start_date <= latest):
+        querysets.append(ARCHIVES[model].objects.all())
+    return querysets
+
+
+def union_with_archive(queryset, archived_queryset, all=True):
+    """
+    UNION a (filtered, possibly ordered) hot queryset with its archived
+    counterpart, keeping the hot queryset's ordering on the combined result.
+    """
+    ordering = queryset.query.order_by
+    combined = queryset.order_by().union(archived_queryset.order_by(), all=all)
+    if ordering:
+        combined = combined.order_by(*ordering)
+    return combined
+
+
+def archive_before(model, cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Move `model` rows dated before `cutoff` into the archive table, one
+    batch per transaction so writers are only held up briefly. Returns the
+    number of rows moved.
+
+    The hot rows are deleted without signals, so the run bumps the data
+    version and forces clients into a full sync once, at the end, instead
+    of logging and broadcasting a delete per row.
+    """
+    archived_model = ARCHIVES[model]
+    fields = _field_names(archived_model)
+    candidates = model.objects.filter(date__lt=cutoff)
+    if model is Transaction:
+        # Keep transactions that TransactionProduct rows still point at;
+        # deleting them would cascade to those links.
+        candidates = candidates.filter(transactionproduct__isnull=True)
+
+    moved = 0
+    while True:
+        with transaction.atomic(using=stores.alias()):
+            ids = list(candidates.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            rows = model.objects.filter(id__in=ids).values(*fields)
+            archived_model.objects.bulk_create(
+                [archived_model(**row) for row in rows], batch_size=batch_size)
+            model.objects.filter(id__in=ids)._raw_delete(stores.alias())
+        moved += len(ids)
+    if moved:
+        with transaction.atomic(using=stores.alias()):
+            bump_version()
+            require_full_sync()
+    return moved
@@ -0,0 +1,93 @@
+"""
+Name suggestions for the entry form (/api/autocomplete/<kind>/?q=).
+
+Each kind's names are deduplicated case-insensitively with a frequency
+count by one GROUP BY query, kept in process and rebuilt when the data
+version moves on. Lookups are a binary search over the sorted names for
+prefix matches, then a scan for substring matches, each ranked by
+frequency. Products are ranked by units sold over the sales velocity
+window (see backend.stock), which transactions keep current.
+"""
+from bisect import bisect_left
+import threading
+
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Product, Expense, ArchivedExpense
+from .versioning import current_version
+from . import stores
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def _expense_names():
+    # Expense names recur (rent, fees); history in the archive counts too.
+    for model in (Expense, ArchivedExpense):
+        yield from model.objects.values_list('name').annotate(count=Count('id')).order_by()
+
+
+def _product_names():
+    # Product.number_sold is entered by hand and transactions don't move it.
+    return (Product.objects.filter(is_retired=False)
+            .annotate(sold=Coalesce(Sum('dailyproductsales__units'), 0))
+            .values_list('name', 'sold'))
+
+
+SOURCES = {
+    'expenses': _expense_names,
+    'products': _product_names,
+}
+
+
+class NameIndex:
+    def __init__(self, rows):
+        counts = {}
+        spellings = {}
+        for name, count in rows:
+            key = name.strip().lower()
+            if not key:
+                continue
+            counts[key] = counts.get(key, 0) + count
+            # Show the most frequent spelling of names differing only in case.
+            if count > spellings.get(key, ('', -1))[1]:
+                spellings[key] = (name.strip(), count)
+        self.keys = sorted(counts)
+        self.entries = [(spellings[key][0], counts[key]) for key in self.keys]
+
+    def search(self, query, limit):
+        query = query.strip().lower()
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + '\uffff', start)
+        prefixed = list(range(start, end))
+        matches = sorted(prefixed, key=lambda i: -self.entries[i][1])
+        if len(matches) < limit and query:
+            contained = [i for i, key in enumerate(self.keys)
+                         if query in key and not start <= i < end]
+            matches += sorted(contained, key=lambda i: -self.entries[i][1])
+        return [{'name': self.entries[i][0], 'count': self.entries[i][1]} for i in matches[:limit]]
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def index(kind):
+    key = (stores.alias(), kind)
+    version = current_version()
+    cached = _cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _lock:
+        cached = _cache.get(key)
+        if cached is None or cached[0] != version:
+            cached = _cache[key] = (version, NameIndex(SOURCES[kind]()))
+    return cached[1]
+
+
+def suggest(kind, query, limit=DEFAULT_LIMIT):
+    """Up to `limit` names of `kind` starting with, then containing, `query`."""
+    if kind not in SOURCES:
+        raise KeyError(kind)
+    return index(kind).search(query, max(1, min(limit, MAX_LIMIT)))
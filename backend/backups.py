@@ -0,0 +1,275 @@
+"""
+Online backups of the SQLite database(s).
+
+A backup is a consistent snapshot taken with SQLite's backup API while the
+app keeps running: pages are copied BACKUP_PAGES_PER_STEP at a time with a
+BACKUP_STEP_SLEEP pause in between, so the register is never locked out
+for more than one short step. Writes from other connections restart the
+copy, so under steady writes it falls back to a single step after
+BACKUP_MAX_RESTARTS restarts rather than never finishing. Each backup is written to BACKUP_DIR as
+`<store>-<timestamp>.sqlite3` (gzipped with BACKUP_COMPRESS) next to a
+JSON manifest holding its SHA-256, size, timing and data version.
+
+After every backup only the newest BACKUP_KEEP are kept, plus the newest
+of each day for BACKUP_KEEP_DAILY days. `restore(...)` checks a backup's
+checksum and integrity before copying it back over the live database.
+"""
+from datetime import datetime, timedelta
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+from .models import DataVersion
+from .versioning import current_version, ensure_version_row
+from . import boot
+from . import stores
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+
+class BackupError(Exception):
+    pass
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _directory():
+    os.makedirs(settings.BACKUP_DIR, exist_ok=True)
+    return settings.BACKUP_DIR
+
+
+def _lock(store):
+    with _locks_lock:
+        return _locks.setdefault(store, threading.Lock())
+
+
+def _database_path(store):
+    return connections[stores.alias(store)].settings_dict['NAME']
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy(source, target, pages):
+    copied = [0]
+    restarts = [0]
+
+    # Sleeping in the progress callback happens between steps, when the
+    # backup holds no lock on the source.
+    def pause(status, remaining, total):
+        # A write in between made SQLite start over from the first page.
+        if total - remaining <= copied[0]:
+            restarts[0] += 1
+            if restarts[0] > settings.BACKUP_MAX_RESTARTS:
+                raise _Restarted
+        copied[0] = total - remaining
+        time.sleep(settings.BACKUP_STEP_SLEEP)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=pause)
+        except _Restarted:
+            # One step holds the source's lock until it is done, but ends.
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _integrity(path):
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        return connection.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        connection.close()
+
+
+def list_backups(store=None):
+    """Manifests of the stored backups (of `store`, if given), newest first."""
+    directory = _directory()
+    manifests = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if store is None or manifest['store'] == store:
+            manifests.append(manifest)
+    return manifests
+
+
+def latest(store=None):
+    manifests = list_backups(store or stores.current())
+    return manifests[0] if manifests else None
+
+
+def _expired(manifests, now):
+    keep = {m['file'] for m in manifests[:settings.BACKUP_KEEP]}
+    oldest_day = (now - timedelta(days=settings.BACKUP_KEEP_DAILY)).date().isoformat()
+    days = set()
+    for manifest in manifests:
+        day = manifest['finished'][:10]
+        if day >= oldest_day and day not in days:
+            days.add(day)
+            keep.add(manifest['file'])
+    return [m for m in manifests if m['file'] not in keep]
+
+
+def _trim(store, now):
+    directory = _directory()
+    for manifest in _expired(list_backups(store), now):
+        # Manifest first: a listed backup always has its file.
+        for name in (manifest['id'] + '.json', manifest['file']):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def backup(store=None, compress=None, force=False):
+    """
+    Back up `store` (default: the current one) and apply the retention
+    policy. Unless `force`, an existing backup of the same data version is
+    returned instead of taking another. Returns the backup's manifest.
+    """
+    store = store or stores.current()
+    compress = settings.BACKUP_COMPRESS if compress is None else compress
+    with _lock(store), stores.use_store(store):
+        version = current_version()
+        previous = latest(store)
+        if (not force and previous and previous['version'] == version
+                and os.path.exists(os.path.join(_directory(), previous['file']))):
+            return previous
+
+        directory = _directory()
+        started = datetime.now()
+        start = time.perf_counter()
+        backup_id = f'{store}-{started:%Y%m%d-%H%M%S-%f}'
+        filename = backup_id + ('.sqlite3.gz' if compress else '.sqlite3')
+        partial = os.path.join(directory, backup_id + '.partial')
+        try:
+            _copy(_database_path(store), partial, settings.BACKUP_PAGES_PER_STEP)
+            if compress:
+                with open(partial, 'rb') as src, gzip.open(partial + '.gz', 'wb') as dst:
+                    shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+                os.replace(partial + '.gz', partial)
+            path = os.path.join(directory, filename)
+            os.replace(partial, path)
+        finally:
+            for leftover in (partial, partial + '.gz'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        finished = datetime.now()
+        manifest = {
+            'id': backup_id,
+            'store': store,
+            'file': filename,
+            'compressed': compress,
+            'size': os.path.getsize(path),
+            'sha256': _sha256(path),
+            'version': version,
+            'started': started.isoformat(timespec='seconds'),
+            'finished': finished.isoformat(timespec='seconds'),
+            'duration_s': round(time.perf_counter() - start, 3),
+        }
+        manifest_path = os.path.join(directory, backup_id + '.json')
+        with open(manifest_path + '.partial', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_path + '.partial', manifest_path)
+        _trim(store, finished)
+        return manifest
+
+
+def find(name, store=None):
+    """
+    The manifest of a stored backup, by id, file name or 'latest'. Raises
+    FileNotFoundError when there is no such backup.
+    """
+    if name == 'latest':
+        manifest = latest(store)
+    else:
+        name = os.path.basename(name)
+        manifest = next((m for m in list_backups(store) if name in (m['id'], m['file'])), None)
+    if manifest is None:
+        raise FileNotFoundError(name)
+    return manifest
+
+
+def verify(manifest):
+    """Check that a backup's file is present and matches its checksum. Raises BackupError."""
+    path = os.path.join(_directory(), manifest['file'])
+    if not os.path.exists(path):
+        raise BackupError(f'Backup file is missing: {manifest["file"]}')
+    if _sha256(path) != manifest['sha256']:
+        raise BackupError(f'Checksum mismatch for {manifest["file"]}')
+
+
+def restore(manifest, store=None):
+    """
+    Copy a verified backup over the live database of `store` (default: the
+    backup's own). The data version moves past anything clients have seen,
+    so they all reload in full.
+    """
+    store = store or manifest['store']
+    verify(manifest)
+    path = os.path.join(_directory(), manifest['file'])
+    with _lock(store), stores.use_store(store), tempfile.TemporaryDirectory() as scratch:
+        if manifest['compressed']:
+            copy = os.path.join(scratch, 'restore.sqlite3')
+            with gzip.open(path, 'rb') as src, open(copy, 'wb') as dst:
+                shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+            path = copy
+        result = _integrity(path)
+        if result != 'ok':
+            raise BackupError(f'Backup failed the integrity check: {result}')
+
+        live_version = current_version()
+        # All pages in one step: the restore must not interleave with writes.
+        _copy(path, _database_path(store), -1)
+        # The stamp described the replaced file; a backup from before the
+        # latest migrations is brought up to date here, not skipped at boot.
+        alias = stores.alias(store)
+        boot.forget_migrations(alias)
+        if not boot.migrations_current(alias):
+            call_command('migrate', database=alias, interactive=False, verbosity=0)
+            boot.record_migrations(alias)
+        version = max(live_version, current_version()) + 1
+        ensure_version_row()
+        DataVersion.objects.filter(pk=1).update(version=version, compacted_through=version)
+        return version
+
+
+def status():
+    """The latest backup of each store, for the status endpoint."""
+    report = {}
+    for store in stores.names():
+        manifest = latest(store)
+        report[store] = manifest and {
+            key: manifest[key] for key in ('file', 'finished', 'duration_s', 'size', 'version')}
+    return report
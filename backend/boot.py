@@ -0,0 +1,95 @@
+import hashlib
+import os
+import threading
+import time
+
+from django.apps import apps
+from django.db import connections
+
+from . import stores
+
+# Set by manage.py before Django is imported, so `import` timings include
+# settings and app loading.
+STARTED_AT = float(os.environ.get('DASHBOARD_BOOT_STARTED', time.time()))
+
+# Seconds spent in each startup phase, filled in by `manage.py serve`.
+timings = {}
+
+# Set once `serve` has seen the server answer its own readiness probe.
+ready = threading.Event()
+
+# Database aliases known to be fully migrated.
+_migrated = set()
+
+
+def since_start():
+    return time.time() - STARTED_AT
+
+
+def migrations_hash():
+    """Hash of every installed app's migration files (names and contents)."""
+    digest = hashlib.sha256()
+    for app_config in sorted(apps.get_app_configs(), key=lambda a: a.label):
+        directory = os.path.join(app_config.path, 'migrations')
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.py'):
+                continue
+            digest.update(f'{app_config.label}/{name}'.encode())
+            with open(os.path.join(directory, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _stamp_path(alias):
+    # Lives next to the database so it is lost (and migrate re-runs) along
+    # with the database file.
+    return f"{connections[alias].settings_dict['NAME']}.migrations"
+
+
+def _read_stamp(alias):
+    try:
+        with open(_stamp_path(alias)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def pending_migrations(alias='default'):
+    from django.db.migrations.executor import MigrationExecutor
+
+    executor = MigrationExecutor(connections[alias])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def migrations_current(alias=None):
+    """
+    Whether the database is fully migrated (every store's, without an
+    alias). A matching stamp file answers this without loading the
+    migration graph; otherwise the graph is checked once and the stamp
+    refreshed if nothing is pending.
+    """
+    if alias is None:
+        return all(migrations_current(alias) for alias in stores.aliases())
+    if alias not in _migrated:
+        if _read_stamp(alias) == migrations_hash():
+            _migrated.add(alias)
+        elif not pending_migrations(alias):
+            record_migrations(alias)
+    return alias in _migrated
+
+
+def forget_migrations(alias='default'):
+    """Drop the stamp of a database whose file was replaced, e.g. by a restore."""
+    _migrated.discard(alias)
+    try:
+        os.remove(_stamp_path(alias))
+    except FileNotFoundError:
+        pass
+
+
+def record_migrations(alias='default'):
+    with open(_stamp_path(alias), 'w') as f:
+        f.write(migrations_hash())
+    _migrated.add(alias)
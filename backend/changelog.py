@@ -0,0 +1,67 @@
+"""
+Change log behind the `?since=<version>` delta sync of the list endpoints.
+
+Every save or delete of a product, expense or transaction appends the row
+id, the operation and the data version it produced. A client that synced
+at version N asks for the rows changed after N: those still present are
+sent again, the rest come back as delete tombstones. Entries are dropped
+by `manage.py compact_changelog`, and bulk writes (which skip signals)
+mark the log as compacted, so older versions fall back to a full sync.
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete
+
+from .models import ChangeLog, DataVersion
+from .versioning import current_version, written_version
+from . import stores
+
+
+def record_change(sender, instance, signal, created=False, **kwargs):
+    # Connected to post_save/post_delete in apps.ready(), after
+    # bump_on_write and in the same transaction as the write, so the entry
+    # commits together with the row and the version it produced.
+    if signal is post_delete:
+        op = 'delete'
+    else:
+        op = 'create' if created else 'update'
+    ChangeLog.objects.create(
+        table=sender._meta.model_name, row_id=instance.pk, op=op, version=written_version(instance))
+
+
+def compacted_through():
+    return DataVersion.objects.using(stores.alias()).values_list(
+        'compacted_through', flat=True).first() or 0
+
+
+def _raise_floor(version):
+    DataVersion.objects.filter(pk=1).update(compacted_through=Greatest(F('compacted_through'), version))
+
+
+def require_full_sync():
+    """Make every client sync in full next time; used after bulk writes."""
+    _raise_floor(current_version())
+
+
+def compact(before):
+    """Drop entries created before the datetime `before`. Returns the number removed."""
+    old = ChangeLog.objects.filter(created_at__lt=before)
+    latest = old.order_by('-version').values_list('version', flat=True).first()
+    if latest is None:
+        return 0
+    # Raise the floor first so no client is told there were no changes.
+    _raise_floor(latest)
+    deleted, _ = ChangeLog.objects.filter(version__lte=latest).delete()
+    return deleted
+
+
+def changed_ids(model, since):
+    """
+    Ids of `model` rows saved or deleted after version `since`, or None when
+    the log no longer reaches back that far (or `since` is from the future,
+    e.g. a client of a restored database).
+    """
+    if since < compacted_through() or since > current_version():
+        return None
+    return set(ChangeLog.objects.filter(
+        table=model._meta.model_name, version__gt=since).values_list('row_id', flat=True))
@@ -0,0 +1,376 @@
+"""
+Server-sent events stream of data changes (GET /api/events/, or
+/stores/<name>/api/events/ for another store).
+
+Every save and delete of a product, expense or transaction is appended to
+the change log (see backend.changelog) with the data version it produced.
+A relay thread in each server process polls the log of every store and
+hands new entries to that store's broadcaster, which fans them out to the
+store's open streams. A stream therefore carries the writes of every
+worker process: commits in its own process wake the relay at once, those
+of other workers arrive within RELAY_INTERVAL.
+
+Event ids are data versions, the same in every process, so a client that
+reconnects to any worker resumes from its Last-Event-ID while the events
+it missed are still buffered. Otherwise, and after writes the log does
+not cover (bulk writes, restores), it gets a `reset` event and should
+reload in full.
+"""
+from collections import deque
+import asyncio
+import json
+import queue
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.urls import reverse
+
+from .models import ChangeLog, DataVersion, Expense, Product, Transaction
+from . import stores
+
+LOGGED_MODELS = {model._meta.model_name: model for model in (Product, Expense, Transaction)}
+
+# Events kept per store for Last-Event-ID resumption.
+BUFFER_SIZE = 1000
+
+# Seconds between polls of the change log for writes of other processes.
+RELAY_INTERVAL = 0.5
+
+# Seconds between keep-alive comments on an idle stream, so proxies and
+# browsers don't time the connection out.
+KEEPALIVE_INTERVAL = 15
+
+# Milliseconds the browser waits before reconnecting.
+RETRY_MS = 3000
+
+KEEPALIVE = b': keepalive\n\n'
+
+
+def _message(version, event):
+    data = json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'id: {version}\nevent: change\ndata: {data}\n\n'.encode()
+
+
+def _reset(version):
+    # Carries the version to reload at, so the reconnect after the reload
+    # resumes from there.
+    return f'id: {version}\nevent: reset\ndata: {{}}\n\n'.encode()
+
+
+class Broadcaster:
+    """The events of one store, as relayed from its change log."""
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        # Subscribers waiting for the relay's first read of the log, with
+        # the Last-Event-ID they asked to resume from.
+        self._pending = {}
+        self._buffer = deque(maxlen=buffer_size)
+        # Data version the log has been relayed up to (None before the
+        # first read), and the newest version whose event is gone.
+        self.version = None
+        self._floor = 0
+
+    def _missed(self, last_event_id):
+        """Buffered messages after `last_event_id`, or None if they can't be replayed."""
+        if not last_event_id:
+            return []
+        if not last_event_id.isdigit():
+            return None
+        version = int(last_event_id)
+        if version < self._floor or version > self.version:
+            return None
+        return [message for v, message in self._buffer if v > version]
+
+    def _append(self, version, message):
+        if len(self._buffer) == self._buffer.maxlen:
+            self._floor = max(self._floor, self._buffer[0][0])
+        self._buffer.append((version, message))
+
+    def prime(self, version, floor, messages):
+        """Start from the log's recent `messages`, as (version, message) pairs."""
+        with self._lock:
+            self.version = version
+            self._floor = floor
+            for v, message in messages:
+                self._append(v, message)
+            for deliver, last_event_id in self._pending.items():
+                missed = self._missed(last_event_id)
+                for message in missed if missed is not None else [_reset(version)]:
+                    deliver(message)
+                self._subscribers.add(deliver)
+            self._pending.clear()
+
+    def publish(self, version, floor, messages):
+        with self._lock:
+            for v, message in messages:
+                self._append(v, message)
+                # Delivered under the lock so every subscriber sees events
+                # in version order; `deliver` callbacks must not block.
+                for deliver in self._subscribers:
+                    deliver(message)
+            self.version = version
+            self._floor = max(self._floor, floor)
+
+    def reset(self, version, floor):
+        """Writes the log doesn't cover happened: every stream has to reload."""
+        with self._lock:
+            self._buffer.clear()
+            self.version = version
+            self._floor = floor
+            for deliver in self._subscribers:
+                deliver(_reset(version))
+
+    def subscribe(self, deliver, last_event_id=None):
+        """
+        Start calling `deliver(message)` for each new event. Returns the
+        opening messages for the stream, including any missed events.
+        """
+        with self._lock:
+            if self.version is None:
+                self._pending[deliver] = last_event_id
+                missed = []
+            else:
+                missed = self._missed(last_event_id)
+                self._subscribers.add(deliver)
+            version = self.version
+        opening = [f'retry: {RETRY_MS}\n\n'.encode()]
+        return opening + (missed if missed is not None else [_reset(version)])
+
+    def unsubscribe(self, deliver):
+        with self._lock:
+            self._subscribers.discard(deliver)
+            self._pending.pop(deliver, None)
+
+
+def _events(entries):
+    """(version, message) pairs for change log `entries` of the current store."""
+    alias = stores.alias()
+    rows = {}
+    for table, model in LOGGED_MODELS.items():
+        ids = {row_id for t, row_id, op, _ in entries if t == table and op != 'delete'}
+        if ids:
+            rows[table] = model.objects.using(alias).in_bulk(ids)
+    messages = []
+    for table, row_id, op, version in entries:
+        # The row as it is now; a row deleted since is followed by its
+        # delete event.
+        row = rows.get(table, {}).get(row_id) if op != 'delete' else None
+        values = row and {f.attname: getattr(row, f.attname)
+                          for f in LOGGED_MODELS[table]._meta.concrete_fields}
+        event = {
+            'store': stores.current(),
+            'table': table,
+            'op': op,
+            'id': row_id,
+            'values': values,
+            'version': version,
+        }
+        messages.append((version, _message(version, event)))
+    return messages
+
+
+def _log(**filters):
+    log = ChangeLog.objects.using(stores.alias()).filter(**filters)
+    return log.values_list('table', 'row_id', 'op', 'version')
+
+
+class Relay:
+    """Polls the change log of every store and feeds the stores' broadcasters."""
+
+    def __init__(self, broadcasters):
+        self.broadcasters = broadcasters
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='events', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            for store, broadcaster in self.broadcasters.items():
+                try:
+                    with stores.use_store(store):
+                        self._poll(broadcaster)
+                except Exception as e:
+                    print(f'Relaying events of {store} failed: {e}')
+            self._wake.wait(RELAY_INTERVAL)
+            self._wake.clear()
+
+    def _poll(self, broadcaster):
+        version, floor = DataVersion.objects.using(stores.alias()).values_list(
+            'version', 'compacted_through').first() or (0, 0)
+        if broadcaster.version is None:
+            # The newest BUFFER_SIZE entries, plus one to tell where the
+            # buffer stops reaching back. Per table, along the log's index.
+            recent = sorted(
+                (entry for table in LOGGED_MODELS
+                 for entry in _log(table=table, version__lte=version).order_by('-version')[:BUFFER_SIZE + 1]),
+                key=lambda entry: entry[3], reverse=True)[:BUFFER_SIZE + 1]
+            if len(recent) > BUFFER_SIZE:
+                floor = max(floor, recent.pop()[3])
+            broadcaster.prime(version, floor, _events(recent[::-1]))
+        elif floor > broadcaster.version:
+            broadcaster.reset(version, floor)
+        elif version > broadcaster.version:
+            # SQLite commits writes in version order, so every entry up to
+            # `version` is already visible.
+            entries = sorted(
+                (entry for table in LOGGED_MODELS
+                 for entry in _log(table=table, version__gt=broadcaster.version, version__lte=version)),
+                key=lambda entry: entry[3])
+            broadcaster.publish(version, floor, _events(entries))
+
+
+broadcasters = {store: Broadcaster() for store in stores.names()}
+relay = Relay(broadcasters)
+
+
+def publish_change(sender, instance, signal, created=False, **kwargs):
+    # Connected to post_save/post_delete of the data models in apps.ready(),
+    # after record_change, inside the write's transaction. Once it commits
+    # the relay reads the entry without waiting for its next poll.
+    transaction.on_commit(relay.wake, using=kwargs.get('using'))
+
+
+def subscribe(store, deliver, last_event_id=None):
+    relay.start()
+    return broadcasters[store].subscribe(deliver, last_event_id)
+
+
+def stream(store, last_event_id=None):
+    """Blocking generator of SSE messages, for WSGI and the development server."""
+    messages = queue.Queue()
+    opening = subscribe(store, messages.put, last_event_id)
+    try:
+        yield from opening
+        while True:
+            try:
+                yield messages.get(timeout=KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                yield KEEPALIVE
+    finally:
+        broadcasters[store].unsubscribe(messages.put)
+
+
+def _cors_headers(scope):
+    # This handler runs outside Django's middleware, so apply the CORS
+    # allowlist the API uses.
+    origin = dict(scope['headers']).get(b'origin', b'').decode('latin-1')
+    if origin in getattr(settings, 'CORS_ALLOWED_ORIGINS', []):
+        return [(b'access-control-allow-origin', origin.encode('latin-1'))]
+    return []
+
+
+def _response_headers(scope):
+    return [
+        (b'content-type', b'text/event-stream'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ] + _cors_headers(scope)
+
+
+async def _respond(scope, send, status, body, headers=()):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [*headers, *_cors_headers(scope)]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _store(scope):
+    """The store a stream asks for, chosen as StoreMiddleware would."""
+    if not settings.STORES:
+        return stores.MAIN
+    match = stores.URL_PREFIX.match(scope['path'])
+    if match:
+        store = match['store']
+    else:
+        store = dict(scope['headers']).get(b'x-store', b'').decode('latin-1')
+    return (store or stores.MAIN).strip().lower()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def asgi_stream(scope, receive, send):
+    """
+    Native ASGI handler for the stream. Django 3.2 iterates streaming
+    responses synchronously on the event loop, so an idle stream served
+    through a view would block every other request.
+    """
+    if scope['method'] != 'GET':
+        await _respond(scope, send, 405, b'Method Not Allowed',
+                       [(b'allow', b'GET'), (b'content-type', b'text/plain')])
+        return
+    store = _store(scope)
+    if store not in stores.names():
+        status, error = (400, 'All stores can only be requested for graphs and exports') \
+            if store == stores.ALL else (404, f'Unknown store: {store}')
+        await _respond(scope, send, status, json.dumps({'error': error}).encode(),
+                       [(b'content-type', b'application/json')])
+        return
+
+    loop = asyncio.get_running_loop()
+    messages = asyncio.Queue()
+
+    def deliver(message):
+        loop.call_soon_threadsafe(messages.put_nowait, message)
+
+    last_event_id = dict(scope['headers']).get(b'last-event-id', b'').decode('latin-1')
+    opening = subscribe(store, deliver, last_event_id)
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': _response_headers(scope)})
+        for message in opening:
+            await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+        while not disconnected.done():
+            getter = asyncio.ensure_future(messages.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected}, timeout=KEEPALIVE_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                message = getter.result()
+            else:
+                getter.cancel()
+                if disconnected in done:
+                    break
+                message = KEEPALIVE
+            await send({'type': 'http.response.body', 'body': message, 'more_body': True})
+    except OSError:
+        pass
+    finally:
+        broadcasters[store].unsubscribe(deliver)
+        disconnected.cancel()
+
+
+def route_events(application):
+    """
+    Wrap the Django ASGI application so the events URL, with or without a
+    /stores/<name>/ prefix, is served by `asgi_stream`.
+    """
+    path = None
+
+    async def router(scope, receive, send):
+        nonlocal path
+        if path is None:
+            path = reverse('event-stream')
+        if scope['type'] == 'http':
+            match = settings.STORES and stores.URL_PREFIX.match(scope['path'])
+            if scope['path'] == path or (match and match['rest'] == path):
+                await asgi_stream(scope, receive, send)
+                return
+        await application(scope, receive, send)
+
+    return router
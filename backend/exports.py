@@ -0,0 +1,412 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from itertools import islice
+from xml.sax.saxutils import escape
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import zipfile
+
+# Rows per LongTable. Each chunk is laid out on its own, so layout cost stays
+# linear in the number of rows instead of re-splitting one giant table.
+PDF_CHUNK_ROWS = 500
+
+# Fixed widths (summing to the letter frame width) keep every chunk of a
+# section aligned and skip reportlab's per-table column auto-sizing.
+PRODUCT_COLUMNS = ['Name', 'Stock', 'Price', 'Sold', 'Status']
+PRODUCT_COL_WIDTHS = [188, 60, 80, 60, 80]
+EXPENSE_COLUMNS = ['Name', 'Date', 'Type', 'Amount']
+EXPENSE_COL_WIDTHS = [168, 80, 120, 100]
+TRANSACTION_COLUMNS = ['ID', 'Date', 'Type', 'Total', 'Products']
+TRANSACTION_COL_WIDTHS = [45, 70, 80, 70, 203]
+
+
+DOCX_PRODUCTS_MAX_CHARS = 30
+
+WORD_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+BUNDLE_FORMATS = ['txt', 'pdf', 'docx']
+
+# PDF and DOCX are compressed already; deflating them again only costs time.
+BUNDLE_COMPRESSION = {
+    'txt': zipfile.ZIP_DEFLATED,
+    'pdf': zipfile.ZIP_STORED,
+    'docx': zipfile.ZIP_STORED,
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def fetch_in_chunks(queryset, chunk_size=PDF_CHUNK_ROWS):
+    """
+    Yield the rows of a values() queryset in id order, reading `chunk_size`
+    at a time. Each chunk is fetched in full, and its cursor closed, before
+    any of it is yielded: an open SQLite cursor holds a shared lock that
+    blocks every writer for as long as the rows take to render.
+    """
+    queryset = queryset.order_by('pk')
+    last_id = None
+    while True:
+        page = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+        chunk = list(page[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1]['id']
+
+
+def product_row(p):
+    return [
+        p.get('name', 'N/A'),
+        str(p.get('stock', 0)),
+        f'${p.get("price", 0)}',
+        str(p.get('number_sold', 0)),
+        'Active' if not p.get('is_retired') else 'Retired'
+    ]
+
+
+def expense_row(e):
+    return [
+        e.get('name', 'N/A'),
+        str(e.get('date', 'N/A')),
+        e.get('type', 'N/A'),
+        f'${e.get("price", 0)}'
+    ]
+
+
+def transaction_row(t):
+    return [
+        str(t.get('id', 'N/A')),
+        str(t.get('date', 'N/A')),
+        t.get('type', 'N/A'),
+        f'${t.get("total", 0)}',
+        str(t.get('products', 'N/A'))
+    ]
+
+
+def _pdf_table_style():
+    from reportlab.platypus import TableStyle
+    from reportlab.lib import colors
+
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+
+def _pdf_table_chunks(rows, columns, col_widths, wrap_column=None):
+    from reportlab.platypus import LongTable, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    cell_style = getSampleStyleSheet()['BodyText']
+    table_style = _pdf_table_style()
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, PDF_CHUNK_ROWS))
+        if not chunk:
+            return
+        if wrap_column is not None:
+            for row in chunk:
+                row[wrap_column] = Paragraph(escape(row[wrap_column]), cell_style)
+        table = LongTable([columns] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(table_style)
+        yield table
+
+
+def _pdf_section(heading, records, to_row, columns, col_widths, wrap_column=None):
+    from reportlab.platypus import Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return
+
+    def rows():
+        yield to_row(first)
+        for record in records:
+            yield to_row(record)
+
+    yield Paragraph(heading, getSampleStyleSheet()['Heading2'])
+    yield from _pdf_table_chunks(rows(), columns, col_widths, wrap_column)
+    yield Spacer(1, 20)
+
+
+def _pdf_flowables(data, data_type):
+    from reportlab.platypus import Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    styles = getSampleStyleSheet()
+    yield Paragraph('AMANDA LYNN DATA EXPORT', styles['Title'])
+    yield Spacer(1, 12)
+    yield Paragraph(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', styles['Normal'])
+    yield Paragraph(f'Data Type: {data_type.upper()}', styles['Normal'])
+    yield Spacer(1, 20)
+
+    if 'products' in data:
+        yield from _pdf_section('PRODUCTS', data['products'], product_row,
+                                PRODUCT_COLUMNS, PRODUCT_COL_WIDTHS)
+    if 'expenses' in data:
+        yield from _pdf_section('EXPENSES', data['expenses'], expense_row,
+                                EXPENSE_COLUMNS, EXPENSE_COL_WIDTHS)
+    if 'transactions' in data:
+        yield from _pdf_section('TRANSACTIONS', data['transactions'], transaction_row,
+                                TRANSACTION_COLUMNS, TRANSACTION_COL_WIDTHS,
+                                wrap_column=4)
+
+
+def render_pdf(data, data_type, out):
+    """
+    Render an export PDF into the binary file object `out`.
+
+    `data` maps section names to iterables of row dicts. Flowables are
+    produced lazily while the document is laid out, so layout only ever
+    holds the chunk being placed. reportlab still keeps every finished
+    page's content until the document is saved, so memory grows with the
+    size of the PDF (about 20 MiB for 30k transactions).
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+
+    class ChunkedDocTemplate(SimpleDocTemplate):
+        # build() pops flowables off the front of its list; top that list up
+        # from the generator so it never runs dry before the generator does.
+        # Internal lists (page-begin hangers) pass through here too.
+        def filterFlowables(self, flowables):
+            if flowables is queue and len(flowables) < 2:
+                flowables.extend(islice(pending, 1))
+
+    pending = _pdf_flowables(data, data_type)
+    queue = list(islice(pending, 1))
+    doc = ChunkedDocTemplate(out, pagesize=letter)
+    doc.build(queue)
+
+
+def _docx_run_xml(text):
+    # Mirrors what python-docx writes for `cell.text = text`: line breaks and
+    # tabs become <w:br/>/<w:tab/>, and edge whitespace is preserved.
+    if not text:
+        return '<w:r/>'
+    parts = []
+    for piece in re.split(r'(\r\n|[\r\n\t])', text):
+        if piece == '\t':
+            parts.append('<w:tab/>')
+        elif piece in ('\n', '\r', '\r\n'):
+            parts.append('<w:br/>')
+        elif piece:
+            space = ' xml:space="preserve"' if piece != piece.strip() else ''
+            parts.append(f'<w:t{space}>{escape(piece)}</w:t>')
+    return f'<w:r>{"".join(parts)}</w:r>'
+
+
+def add_docx_table(doc, columns, rows):
+    """
+    Append a 'Table Grid' table with a header row and `rows` to `doc`.
+
+    python-docx's `table.add_row()` re-reads the grid on every call, which
+    gets slow for thousands of rows. The body rows are instead rendered to
+    XML in one pass and parsed once, producing the same markup.
+    """
+    from docx.oxml import parse_xml
+
+    table = doc.add_table(rows=1, cols=len(columns))
+    table.style = 'Table Grid'
+    for cell, heading in zip(table.rows[0].cells, columns):
+        cell.text = heading
+
+    tbl = table._tbl
+    cell_props = [
+        f'<w:tcPr><w:tcW w:type="dxa" w:w="{grid_col.w.twips}"/></w:tcPr>'
+        for grid_col in tbl.tblGrid.gridCol_lst
+    ]
+    row_xml = [
+        '<w:tr>' + ''.join(
+            f'<w:tc>{props}<w:p>{_docx_run_xml(value)}</w:p></w:tc>'
+            for props, value in zip(cell_props, row)
+        ) + '</w:tr>'
+        for row in rows
+    ]
+    if row_xml:
+        body = parse_xml(f'<w:tbl xmlns:w="{WORD_NAMESPACE}">{"".join(row_xml)}</w:tbl>')
+        tbl.extend(list(body))
+    return table
+
+
+def _docx_transaction_row(t):
+    row = transaction_row(t)
+    if len(row[4]) > DOCX_PRODUCTS_MAX_CHARS:
+        row[4] = row[4][:DOCX_PRODUCTS_MAX_CHARS] + '...'
+    return row
+
+
+def render_docx(data, data_type, out):
+    """Render an export DOCX into the binary file object `out`."""
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
+    doc = Document()
+
+    # Title
+    title = doc.add_heading('AMANDA LYNN DATA EXPORT', 0)
+    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+
+    doc.add_paragraph(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    doc.add_paragraph(f'Data Type: {data_type.upper()}')
+    doc.add_paragraph('')
+
+    if 'products' in data and data['products']:
+        doc.add_heading('PRODUCTS', level=1)
+        add_docx_table(doc, PRODUCT_COLUMNS, map(product_row, data['products']))
+        doc.add_paragraph('')
+
+    if 'expenses' in data and data['expenses']:
+        doc.add_heading('EXPENSES', level=1)
+        add_docx_table(doc, EXPENSE_COLUMNS, map(expense_row, data['expenses']))
+        doc.add_paragraph('')
+
+    if 'transactions' in data and data['transactions']:
+        doc.add_heading('TRANSACTIONS', level=1)
+        add_docx_table(doc, TRANSACTION_COLUMNS, map(_docx_transaction_row, data['transactions']))
+
+    doc.save(out)
+
+
+def render_txt(data, data_type, out):
+    """Render a plain-text export into the binary file object `out`."""
+    content = []
+    content.append('=' * 60)
+    content.append('AMANDA LYNN DATA EXPORT')
+    content.append(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+    content.append(f'Data Type: {data_type.upper()}')
+    content.append('=' * 60)
+    content.append('')
+
+    if 'products' in data and data['products']:
+        content.append('-' * 40)
+        content.append('PRODUCTS')
+        content.append('-' * 40)
+        for i, p in enumerate(data['products'], 1):
+            content.append(f'{i}. {p.get("name", "N/A")}')
+            content.append(f'   Stock: {p.get("stock", 0)}')
+            content.append(f'   Price: ${p.get("price", 0)}')
+            content.append(f'   Sold: {p.get("number_sold", 0)}')
+            content.append(f'   Status: {"Active" if not p.get("is_retired") else "Retired"}')
+            content.append('')
+
+    if 'expenses' in data and data['expenses']:
+        content.append('')
+        content.append('-' * 40)
+        content.append('EXPENSES')
+        content.append('-' * 40)
+        for i, e in enumerate(data['expenses'], 1):
+            content.append(f'{i}. {e.get("name", "N/A")}')
+            content.append(f'   Date: {e.get("date", "N/A")}')
+            content.append(f'   Type: {e.get("type", "N/A")}')
+            content.append(f'   Amount: ${e.get("price", 0)}')
+            content.append('')
+
+    if 'transactions' in data and data['transactions']:
+        content.append('')
+        content.append('-' * 40)
+        content.append('TRANSACTIONS')
+        content.append('-' * 40)
+        for i, t in enumerate(data['transactions'], 1):
+            content.append(f'{i}. Transaction #{t.get("id", "N/A")}')
+            content.append(f'   Date: {t.get("date", "N/A")}')
+            content.append(f'   Type: {t.get("type", "N/A")}')
+            content.append(f'   Total: ${t.get("total", 0)}')
+            content.append(f'   Products: {t.get("products", "N/A")}')
+            content.append('')
+
+    content.append('')
+    content.append('=' * 60)
+    content.append('END OF EXPORT')
+    content.append('=' * 60)
+
+    out.write('\n'.join(content).encode())
+
+
+RENDERERS = {
+    'txt': render_txt,
+    'pdf': render_pdf,
+    'docx': render_docx,
+}
+
+
+def bundle_formats(value):
+    """The formats named in a comma-separated `formats` parameter (default: all)."""
+    if not value:
+        return list(BUNDLE_FORMATS)
+    formats = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if name not in RENDERERS:
+            raise ValueError(f'Unknown export format: {name}')
+        if name not in formats:
+            formats.append(name)
+    return formats
+
+
+def _worker_pool(workers):
+    # Started on first use and kept; 'spawn' because forking the threaded
+    # server process could copy locks held by other threads.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _render_file(format_type, data, data_type, path):
+    # Runs in a worker process.
+    with open(path, 'wb') as out:
+        RENDERERS[format_type](data, data_type, out)
+    return format_type, path
+
+
+def render_bundle(data, data_type, formats, filename, out, workers):
+    """
+    Render `data` once per format in `formats`, side by side in worker
+    processes, into a ZIP written to the binary file object `out`.
+
+    `data` maps section names to lists of row dicts; it is queried once
+    and sent to every worker. Each finished file is added to the archive
+    while the slower formats are still rendering.
+    """
+    pool = _worker_pool(workers)
+    with tempfile.TemporaryDirectory() as directory, zipfile.ZipFile(out, 'w') as archive:
+        try:
+            futures = [
+                pool.submit(_render_file, format_type, data, data_type,
+                            os.path.join(directory, f'{filename}.{format_type}'))
+                for format_type in formats
+            ]
+            for future in as_completed(futures):
+                format_type, path = future.result()
+                archive.write(path, os.path.basename(path),
+                              compress_type=BUNDLE_COMPRESSION[format_type])
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); the next export starts a new pool.
+            _discard_pool(pool)
+            raise
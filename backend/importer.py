@@ -0,0 +1,201 @@
+from datetime import date
+from itertools import islice
+import csv
+
+from django.db import transaction
+
+from .models import Product, Expense, Transaction
+from .changelog import require_full_sync
+from .schemas import MAX_INTEGER, MIN_INTEGER
+from .stock import rebuild_sales
+from .versioning import bump_version
+from . import money
+from . import stores
+
+DEFAULT_BATCH_SIZE = 1000
+
+# The endpoint returns at most this many row errors; the total is always
+# reported in `error_count`.
+MAX_REPORTED_ERRORS = 1000
+
+
+class RowError(ValueError):
+    pass
+
+
+def normalize_name(name):
+    return name.strip().lower()
+
+
+def _required(row, field):
+    value = (row.get(field) or '').strip()
+    if not value:
+        raise RowError(f'Missing field: {field}')
+    return value
+
+
+def _parse_money(row, field):
+    value = _required(row, field)
+    try:
+        return money.parse(value)
+    except (ValueError, ArithmeticError) as e:
+        raise RowError(f'{field}: {e}')
+
+
+def _parse_int(row, field, default=None, min_value=MIN_INTEGER):
+    value = (row.get(field) or '').strip()
+    if not value and default is not None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f'Invalid {field}: {value}')
+    if not min_value <= number <= MAX_INTEGER:
+        raise RowError(f'Invalid {field}: {value} (must be from {min_value} to {MAX_INTEGER})')
+    return number
+
+
+def _parse_date(row, field):
+    value = _required(row, field)
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f'Invalid {field} (expected YYYY-MM-DD): {value}')
+
+
+def _parse_bool(row, field):
+    return (row.get(field) or '').strip().lower() in ('1', 'true', 'yes', 'retired')
+
+
+class ProductRows:
+    model = Product
+    columns = ['name', 'stock', 'price']
+
+    def __init__(self):
+        self.names = {normalize_name(n) for n in Product.objects.values_list('name', flat=True)}
+
+    def build(self, row):
+        name = _required(row, 'name')
+        key = normalize_name(name)
+        if key == 'unknown':
+            raise RowError('Cannot create Unknown Product')
+        if key in self.names:
+            raise RowError(f'Product already exists: {name}')
+        product = Product(
+            name=name,
+            stock=_parse_int(row, 'stock', min_value=0),
+            price=_parse_money(row, 'price'),
+            number_sold=_parse_int(row, 'number_sold', default=0, min_value=0),
+            is_retired=_parse_bool(row, 'is_retired'),
+        )
+        self.names.add(key)
+        return product
+
+
+class ExpenseRows:
+    model = Expense
+    columns = ['name', 'date', 'type', 'price']
+
+    def build(self, row):
+        return Expense(
+            name=_required(row, 'name'),
+            date=_parse_date(row, 'date'),
+            type=_required(row, 'type'),
+            price=_parse_money(row, 'price'),
+        )
+
+
+class TransactionRows:
+    model = Transaction
+    columns = ['total', 'date', 'type', 'products']
+
+    def __init__(self):
+        self.valid_products = {normalize_name(n) for n in Product.objects.values_list('name', flat=True)}
+        self.valid_products.add('unknown')
+
+    def build(self, row):
+        # Products may be separated by ';' or ',' within the cell.
+        products = [p.strip() for p in (row.get('products') or '').replace(';', ',').split(',')]
+        products = [p for p in products if p]
+        for product in products:
+            if normalize_name(product) not in self.valid_products:
+                raise RowError(f'Product does not exist: {product}')
+        # Stored the same way TransactionCreate stores the list it receives.
+        return Transaction(
+            total=_parse_money(row, 'total'),
+            date=_parse_date(row, 'date'),
+            type=_required(row, 'type'),
+            products=str(products),
+        )
+
+
+IMPORTERS = {
+    'products': ProductRows,
+    'expenses': ExpenseRows,
+    'transactions': TransactionRows,
+}
+
+
+def import_csv(lines, kind, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream rows of a CSV (any iterable of text lines with a header row) into
+    the table named by `kind`.
+
+    Rows are validated as they are read and inserted with bulk_create in
+    batches of `batch_size`, each batch in its own savepoint so a failing
+    batch is reported without losing the others. Returns a report dict with
+    the number of imported rows and one entry per rejected row.
+    """
+    if kind not in IMPORTERS:
+        raise ValueError(f'Unknown import type: {kind}')
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+
+    importer = IMPORTERS[kind]()
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None:
+        raise ValueError('CSV file is empty')
+    reader.fieldnames = [normalize_name(f) for f in reader.fieldnames]
+    missing = [c for c in importer.columns if c not in reader.fieldnames]
+    if missing:
+        raise ValueError(f'Missing columns: {", ".join(missing)}')
+
+    report = {'type': kind, 'imported': 0, 'error_count': 0, 'errors': []}
+
+    def reject(line, error):
+        report['error_count'] += 1
+        report['errors'].append({'row': line, 'error': str(error)})
+
+    def validated_rows():
+        for row in reader:
+            # line_num is the physical line the row ended on (1 = header).
+            try:
+                yield reader.line_num, importer.build(row)
+            except RowError as e:
+                reject(reader.line_num, e)
+            except (ValueError, ArithmeticError) as e:
+                # Anything else a bad value raises rejects its row, not the file.
+                reject(reader.line_num, RowError(f'Invalid row: {e}'))
+
+    with transaction.atomic(using=stores.alias()):
+        rows = validated_rows()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            try:
+                with transaction.atomic(using=stores.alias()):
+                    importer.model.objects.bulk_create(
+                        [obj for _, obj in batch], batch_size=batch_size)
+                report['imported'] += len(batch)
+            except Exception as e:
+                for line, _ in batch:
+                    reject(line, f'Batch rejected by database: {e}')
+        if report['imported']:
+            bump_version()
+            require_full_sync()
+            # bulk_create skips the signals that keep sales velocity current.
+            if kind in ('products', 'transactions'):
+                rebuild_sales()
+
+    return report
@@ -0,0 +1,207 @@
+"""
+Routine upkeep of the SQLite database(s), run by `manage.py
+maintain_database` or, with MAINTENANCE_WINDOW set, once a day from the
+`serve` process during those quiet hours.
+
+A run returns free pages to the filesystem with bounded incremental vacuum
+steps, refreshes the planner statistics (ANALYZE within an analysis limit,
+then PRAGMA optimize) and checks integrity. A database still on
+auto_vacuum=NONE is converted once, which needs one full VACUUM; after
+that no run holds the write lock for more than one step.
+
+Each run's file size, freelist count and timings are kept in a JSON file
+next to the database and reported by /api/status/.
+
+The same scheduler moves the sales velocity windows forward each day
+(see backend.stock), whether or not a window is set.
+"""
+from datetime import datetime
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from . import stock
+from . import stores
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Rows sampled per index by ANALYZE; keeps it fast on large tables.
+ANALYSIS_LIMIT = 1000
+
+# Runs kept in each database's maintenance log.
+HISTORY = 20
+
+# Seconds the scheduler sleeps between checks of the window.
+SCHEDULER_INTERVAL = 300
+
+_lock = threading.Lock()
+
+
+def _database_path(store):
+    return connections[stores.alias(store)].settings_dict['NAME']
+
+
+def _log_path(store):
+    # Lives next to the database, like the migration stamp.
+    return f'{_database_path(store)}.maintenance.json'
+
+
+def history(store):
+    try:
+        with open(_log_path(store)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def _record(store, run):
+    runs = ([run] + history(store))[:HISTORY]
+    path = _log_path(store)
+    with open(path + '.partial', 'w') as f:
+        json.dump(runs, f)
+    os.replace(path + '.partial', path)
+
+
+def _pragma(connection, name):
+    return connection.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+def _file_stats(connection, path):
+    return {
+        'size': os.path.getsize(path),
+        'page_count': _pragma(connection, 'page_count'),
+        'freelist_count': _pragma(connection, 'freelist_count'),
+    }
+
+
+def _vacuum(connection):
+    """Free pages in bounded steps. Returns (pages freed, steps taken)."""
+    freed = steps = 0
+    while steps < settings.MAINTENANCE_VACUUM_STEPS:
+        free = _pragma(connection, 'freelist_count')
+        if not free:
+            break
+        # execute() steps the pragma once, freeing a single page;
+        # executescript() runs it to completion.
+        connection.executescript(f'PRAGMA incremental_vacuum({settings.MAINTENANCE_VACUUM_PAGES})')
+        freed += free - _pragma(connection, 'freelist_count')
+        steps += 1
+        time.sleep(settings.MAINTENANCE_STEP_SLEEP)
+    return freed, steps
+
+
+def run(store=None, full_check=False):
+    """Maintain the database of `store` (default: the current one). Returns the run's record."""
+    store = store or stores.current()
+    path = _database_path(store)
+    started = datetime.now()
+    timings = {}
+    with _lock:
+        # Autocommit, so VACUUM and each vacuum step run in their own transaction.
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        try:
+            before = _file_stats(connection, path)
+
+            start = time.perf_counter()
+            converted = _pragma(connection, 'auto_vacuum') != AUTO_VACUUM_INCREMENTAL
+            if converted:
+                connection.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                connection.execute('VACUUM')
+                freed, steps = before['freelist_count'], 0
+            else:
+                freed, steps = _vacuum(connection)
+            timings['vacuum'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            connection.execute(f'PRAGMA analysis_limit = {ANALYSIS_LIMIT}')
+            connection.execute('ANALYZE')
+            connection.execute('PRAGMA optimize')
+            timings['analyze'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            check = 'integrity_check' if full_check else 'quick_check'
+            problems = [row[0] for row in connection.execute(f'PRAGMA {check}')]
+            timings['check'] = time.perf_counter() - start
+
+            after = _file_stats(connection, path)
+        finally:
+            connection.close()
+
+    record = {
+        'store': store,
+        'started': started.isoformat(timespec='seconds'),
+        'duration_s': round(sum(timings.values()), 3),
+        'timings_s': {phase: round(seconds, 3) for phase, seconds in timings.items()},
+        'converted_to_incremental': converted,
+        'pages_freed': freed,
+        'vacuum_steps': steps,
+        'integrity': 'ok' if problems == ['ok'] else problems[:20],
+        'check': check,
+        'before': before,
+        'after': after,
+    }
+    _record(store, record)
+    return record
+
+
+def status():
+    """The latest run for each store, for the status endpoint."""
+    report = {}
+    for store in stores.names():
+        runs = history(store)
+        report[store] = runs[0] if runs else None
+    return report
+
+
+def parse_window(value):
+    """(first hour, last hour) from 'H-H', e.g. '3-5' for 03:00 to 05:59."""
+    first, _, last = value.partition('-')
+    first, last = int(first), int(last or first)
+    if not (0 <= first <= 23 and 0 <= last <= 23):
+        raise ValueError(f'Invalid MAINTENANCE_WINDOW: {value}')
+    return first, last
+
+
+def _in_window(now, window):
+    first, last = window
+    if first <= last:
+        return first <= now.hour <= last
+    return now.hour >= first or now.hour <= last
+
+
+def _ran_today(store, now):
+    runs = history(store)
+    return bool(runs) and runs[0]['started'][:10] == now.date().isoformat()
+
+
+def _schedule(window):
+    while True:
+        now = datetime.now()
+        for store in stores.names():
+            try:
+                with stores.use_store(store):
+                    stock.ensure_current(now.date())
+            except Exception as e:
+                print(f'Sales velocity refresh of {store} failed: {e}')
+            if window and _in_window(now, window) and not _ran_today(store, now):
+                try:
+                    run(store)
+                except Exception as e:
+                    print(f'Maintenance of {store} failed: {e}')
+        time.sleep(SCHEDULER_INTERVAL)
+
+
+def start_scheduler():
+    """
+    Keep sales velocities current and, with MAINTENANCE_WINDOW set,
+    maintain every store once a day within it.
+    """
+    window = parse_window(settings.MAINTENANCE_WINDOW) if settings.MAINTENANCE_WINDOW else None
+    thread = threading.Thread(target=_schedule, args=(window,), name='maintenance', daemon=True)
+    thread.start()
+    return thread
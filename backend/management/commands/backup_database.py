@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import backups, stores
+
+
+class Command(BaseCommand):
+    help = 'Take an online backup of the database while the app keeps running.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store', default=stores.MAIN, choices=stores.names() + [stores.ALL],
+            help='Store to back up, or "all" (default: main).')
+        compression = parser.add_mutually_exclusive_group()
+        compression.add_argument(
+            '--compress', action='store_true', default=None,
+            help='Gzip the backup (default: BACKUP_COMPRESS).')
+        compression.add_argument('--no-compress', action='store_false', dest='compress')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Back up even if nothing changed since the latest backup.')
+        parser.add_argument(
+            '--every', type=float,
+            help='Keep running and take a backup every this many seconds.')
+
+    def run(self, options):
+        names = stores.names() if options['store'] == stores.ALL else [options['store']]
+        for store in names:
+            try:
+                manifest = backups.backup(store, options['compress'], options['force'])
+            except Exception as e:
+                raise CommandError(f'Backup of {store} failed: {e}')
+            self.stdout.write(
+                f'{store}: {manifest["file"]} ({manifest["size"]} bytes, '
+                f'{manifest["duration_s"]:.2f}s, finished {manifest["finished"]})')
+
+    def handle(self, *args, **options):
+        self.run(options)
+        while options['every']:
+            time.sleep(options['every'])
+            self.run(options)
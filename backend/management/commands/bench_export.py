@@ -0,0 +1,119 @@
+from datetime import date, timedelta
+from decimal import Decimal
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.exports import (
+    TRANSACTION_COLUMNS, add_docx_table, render_pdf, transaction_row
+)
+
+
+def synthetic_transactions(count):
+    start = date(2020, 1, 1)
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'date': start + timedelta(days=i % 1500),
+            'type': 'Card' if i % 3 else 'Cash',
+            'total': Decimal(i % 9000) / 100,
+            'products': str([f'Product {n}' for n in range(i % 6 + 1)]),
+        }
+
+
+def add_docx_table_rowwise(doc, columns, rows):
+    # The original one-row-at-a-time python-docx path, kept for comparison.
+    table = doc.add_table(rows=1, cols=len(columns))
+    table.style = 'Table Grid'
+    for cell, heading in zip(table.rows[0].cells, columns):
+        cell.text = heading
+    for row in rows:
+        row_cells = table.add_row().cells
+        for cell, value in zip(row_cells, row):
+            cell.text = value
+    return table
+
+
+def render_pdf_transactions(rows):
+    out = tempfile.TemporaryFile()
+    render_pdf({'transactions': synthetic_transactions(rows)}, 'transactions', out)
+    return out
+
+
+def docx_renderer(add_table):
+    def render(rows):
+        from docx import Document
+
+        doc = Document()
+        add_table(doc, TRANSACTION_COLUMNS, map(transaction_row, synthetic_transactions(rows)))
+        out = tempfile.TemporaryFile()
+        doc.save(out)
+        return out
+    return render
+
+
+RENDERERS = {
+    'pdf': {'pdf': render_pdf_transactions},
+    'docx': {
+        'docx-bulk': docx_renderer(add_docx_table),
+        'docx-rowwise': docx_renderer(add_docx_table_rowwise),
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark export rendering against synthetic transaction tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(RENDERERS), default='pdf',
+            help='Export format to benchmark. docx compares the bulk and row-wise table writers.')
+        parser.add_argument(
+            '--rows', default='1000,10000,100000',
+            help='Comma separated row counts to render.')
+        parser.add_argument(
+            '--skip-memory', action='store_true',
+            help='Skip the (much slower) tracemalloc pass.')
+
+    def _render(self, render, rows, traced):
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter()
+        out = render(rows)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if traced else 0
+        tracemalloc.stop()
+        size = out.tell()
+        out.close()
+        return elapsed, peak, size
+
+    def _check_docx_tables_match(self):
+        from docx import Document
+
+        rows = [transaction_row(t) for t in synthetic_transactions(50)]
+        rows[0][2] = ' padded\tcell\nwith breaks '
+        rows[1][2] = ''
+        bulk = add_docx_table(Document(), TRANSACTION_COLUMNS, rows)
+        rowwise = add_docx_table_rowwise(Document(), TRANSACTION_COLUMNS, rows)
+        if bulk._tbl.xml != rowwise._tbl.xml:
+            raise CommandError('Bulk and row-wise DOCX tables differ.')
+        self.stdout.write('docx: bulk and row-wise table XML are identical')
+
+    def handle(self, *args, **options):
+        sizes = [int(n) for n in options['rows'].split(',')]
+        if options['format'] == 'docx':
+            self._check_docx_tables_match()
+
+        # Time and memory are measured in separate passes because tracemalloc
+        # slows the renderers down several times over.
+        self.stdout.write(
+            f'{"renderer":<14} {"rows":>8} {"seconds":>9} {"us/row":>8} {"peak MiB":>9} {"output MiB":>11}')
+        for rows in sizes:
+            for name, render in RENDERERS[options['format']].items():
+                elapsed, _, size = self._render(render, rows, traced=False)
+                peak = 0 if options['skip_memory'] else self._render(render, rows, traced=True)[1]
+                self.stdout.write(
+                    f'{name:<14} {rows:>8} {elapsed:>9.2f} {elapsed / rows * 1e6:>8.1f} '
+                    f'{peak / 2**20:>9.1f} {size / 2**20:>11.1f}')
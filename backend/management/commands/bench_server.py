@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+GRAPH_BODY = json.dumps({
+    'graph': 'timeseries', 'years': '2023,2024', 'metrics': 'revenue,loss,profit'
+}).encode()
+
+
+def requests_mix():
+    # Alternates a graph computation with a comparison read.
+    while True:
+        yield '/api/graphdata/', GRAPH_BODY
+        yield '/api/products/comparison/', None
+
+
+class Command(BaseCommand):
+    help = 'Measure API throughput of `manage.py serve` at several worker counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['asgi', 'wsgi'], default='asgi')
+        parser.add_argument(
+            '--workers', default='1,2,4',
+            help='Comma separated worker counts to compare.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+        parser.add_argument('--port', type=int, default=8765)
+
+    def _wait_ready(self, base, server):
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Server exited during startup.')
+            try:
+                with urlopen(f'{base}/api/ready/?wait=5', timeout=10):
+                    return
+            except (URLError, OSError):
+                time.sleep(0.2)
+        raise CommandError('Server did not become ready.')
+
+    def _client(self, base, deadline):
+        done = errors = 0
+        for path, body in requests_mix():
+            if time.monotonic() >= deadline:
+                break
+            try:
+                with urlopen(Request(base + path, data=body), timeout=30) as response:
+                    response.read()
+                done += 1
+            except (URLError, OSError):
+                errors += 1
+        return done, errors
+
+    def _run(self, workers, options):
+        base = f'http://127.0.0.1:{options["port"]}'
+        env = {**os.environ, 'SERVER_WORKERS': str(workers)}
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'serve',
+             f'127.0.0.1:{options["port"]}', '--mode', options['mode']],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            self._wait_ready(base, server)
+            deadline = time.monotonic() + options['duration']
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                results = list(pool.map(
+                    lambda _: self._client(base, deadline), range(options['concurrency'])))
+        finally:
+            server.terminate()
+            server.wait()
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"workers":>7} {"requests":>9} {"errors":>7} {"req/s":>8}')
+        for workers in [int(n) for n in options['workers'].split(',')]:
+            done, errors = self._run(workers, options)
+            self.stdout.write(
+                f'{workers:>7} {done:>9} {errors:>7} {done / options["duration"]:>8.1f}')
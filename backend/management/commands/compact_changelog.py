@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from backend import stores
+from backend.changelog import compact
+
+
+class Command(BaseCommand):
+    help = 'Drop old change log entries; clients that synced before them get a full sync.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days', type=int, default=30,
+            help='Keep entries from this many most recent days (default: 30).')
+        parser.add_argument(
+            '--store', default=stores.MAIN, choices=stores.names(),
+            help='Store whose database is used (default: main).')
+
+    def handle(self, *args, **options):
+        if options['keep_days'] < 0:
+            raise CommandError('--keep-days must not be negative')
+        before = timezone.now() - timedelta(days=options['keep_days'])
+        with stores.use_store(options['store']):
+            removed = compact(before)
+        self.stdout.write(f'Removed {removed} change log entries older than {before:%Y-%m-%d %H:%M}')
@@ -0,0 +1,49 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import stores
+from backend.importer import DEFAULT_BATCH_SIZE, IMPORTERS, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products, expenses or transactions from a CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row.')
+        parser.add_argument(
+            '--type', required=True, choices=sorted(IMPORTERS),
+            help='Table the rows are imported into.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Rows per bulk insert (each batch runs in its own savepoint).')
+        parser.add_argument(
+            '--report',
+            help='Write rejected rows to this CSV file instead of printing them.')
+        parser.add_argument(
+            '--store', default=stores.MAIN, choices=stores.names(),
+            help='Store whose database is used (default: main).')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f, \
+                    stores.use_store(options['store']):
+                report = import_csv(f, options['type'], options['batch_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        if options['report']:
+            with open(options['report'], 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=['row', 'error'])
+                writer.writeheader()
+                writer.writerows(report['errors'])
+        else:
+            for error in report['errors']:
+                self.stderr.write(f'row {error["row"]}: {error["error"]}')
+
+        self.stdout.write(
+            f'Imported {report["imported"]} {report["type"]} in {elapsed:.2f}s, '
+            f'{report["error_count"]} rows rejected.')
@@ -0,0 +1,270 @@
+from datetime import date, datetime
+from urllib.parse import urlsplit, urlencode
+import asyncio
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MIX = 'create=5,list=3,graph=1,export=1'
+
+SEARCH_TERMS = ['', '', 'a', 'e', 'Sale', '1']
+LIST_ENDPOINTS = [
+    ('/api/transactions/', ['date', 'total', 'type']),
+    ('/api/expenses/', ['name', 'date', 'price', 'type']),
+    ('/api/products/', ['name', 'price', 'stock', 'number_sold']),
+]
+GRAPH_BODIES = [
+    {'graph': 'timeseries', 'years': str(date.today().year), 'metrics': 'revenue,loss,profit'},
+    {'graph': 'rolling', 'metric': 'revenue'},
+    {'graph': 'expense_breakdown'},
+]
+EXPORTS = [('transactions', 'txt'), ('all', 'txt'), ('transactions', 'pdf'), ('products', 'docx')]
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Connection:
+    """A minimal keep-alive HTTP/1.1 client connection."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}']
+        if body is not None:
+            headers += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode() + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError('Connection closed by server')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304) or status < 200:
+            # No body, whatever Content-Length says.
+            content = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while size := int((await self.reader.readline()).split(b';')[0], 16):
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            await self.reader.readline()
+            content = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list.
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ('create', 'list', 'graph', 'export'):
+            raise CommandError(f'Unknown scenario in --mix: {name}')
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'Invalid weight in --mix: {part}')
+    if not any(mix.values()):
+        raise CommandError('--mix needs at least one positive weight')
+    return mix
+
+
+class Command(BaseCommand):
+    help = ('Replay a mix of register, list, graph and export requests against a '
+            'running server at a target rate, and report latency percentiles.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server base URL.')
+        parser.add_argument('--rate', type=float, default=20.0, help='Target requests per second.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to send for.')
+        parser.add_argument(
+            '--concurrency', type=int, default=32,
+            help='Maximum connections (requests in flight).')
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Scenario weights (default: {DEFAULT_MIX}).')
+        parser.add_argument('--seed', type=int, help='Random seed, to replay the same sequence.')
+        parser.add_argument('--label', default='', help='Stored with the results to tell runs apart.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument(
+            '--keep-data', action='store_true',
+            help='Keep the transactions created during the run instead of deleting them.')
+
+    def _scenario(self, name, rng, products):
+        if name == 'create':
+            body = {
+                'total': f'{rng.uniform(1, 200):.2f}',
+                'date': date.today().isoformat(),
+                'type': 'Sale',
+                'products': ', '.join(rng.sample(products, min(len(products), rng.randint(1, 3)))),
+            }
+            return 'POST', '/api/transactions/create/', json.dumps(body).encode()
+        if name == 'list':
+            path, sort_fields = rng.choice(LIST_ENDPOINTS)
+            query = {'sort_by': rng.choice(sort_fields), 'order': rng.choice(['asc', 'desc'])}
+            search = rng.choice(SEARCH_TERMS)
+            if search:
+                query['search'] = search
+            return 'GET', f'{path}?{urlencode(query)}', None
+        if name == 'graph':
+            return 'POST', '/api/graphdata/', json.dumps(rng.choice(GRAPH_BODIES)).encode()
+        data_type, format_type = rng.choice(EXPORTS)
+        return 'GET', f'/api/export/?{urlencode({"type": data_type, "format": format_type})}', None
+
+    async def _run(self, options, host, port, products):
+        rng = random.Random(options['seed'])
+        mix = parse_mix(options['mix'])
+        names = list(mix)
+        weights = [mix[n] for n in names]
+
+        pool = asyncio.Queue()
+        for _ in range(options['concurrency']):
+            pool.put_nowait(Connection(host, port))
+        samples = {name: [] for name in names}
+        created = []
+
+        async def fire(name, method, path, body, scheduled):
+            connection = await pool.get()
+            try:
+                status, content = await connection.request(method, path, body)
+                error = status >= 400
+                locked = b'database is locked' in content
+                if name == 'create' and status == 201:
+                    created.append(json.loads(content)['id'])
+            except (OSError, HTTPError, asyncio.IncompleteReadError, ValueError):
+                connection.close()
+                status, error, locked = None, True, False
+            finally:
+                pool.put_nowait(connection)
+            # Measured from when the request was due, not when a connection
+            # freed up, so a saturated server shows up as latency.
+            samples[name].append({
+                'latency': time.perf_counter() - scheduled,
+                'status': status, 'error': error, 'locked': locked,
+            })
+
+        interval = 1 / options['rate']
+        start = time.perf_counter()
+        tasks = []
+        sent = 0
+        while (due := start + sent * interval) < start + options['duration']:
+            await asyncio.sleep(max(0, due - time.perf_counter()))
+            name = rng.choices(names, weights)[0]
+            tasks.append(asyncio.ensure_future(
+                fire(name, *self._scenario(name, rng, products), due)))
+            sent += 1
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+        while not pool.empty():
+            pool.get_nowait().close()
+        if created and not options['keep_data']:
+            for pk in created:
+                # The delete views answer 204 with a body, which some servers
+                # abort the connection over, so each gets its own connection.
+                cleanup = Connection(host, port)
+                try:
+                    await cleanup.request('DELETE', f'/api/transactions/delete/{pk}/')
+                except (OSError, HTTPError, asyncio.IncompleteReadError):
+                    pass
+                finally:
+                    cleanup.close()
+        return samples, elapsed
+
+    def _summarize(self, samples, elapsed):
+        results = {}
+        for name, runs in list(samples.items()) + [('all', sum(samples.values(), []))]:
+            if not runs:
+                continue
+            latencies = sorted(r['latency'] * 1000 for r in runs)
+            results[name] = {
+                'requests': len(runs),
+                'throughput': round(len(runs) / elapsed, 2),
+                'error_rate': round(sum(r['error'] for r in runs) / len(runs), 4),
+                'locked_rate': round(sum(r['locked'] for r in runs) / len(runs), 4),
+                'mean_ms': round(sum(latencies) / len(latencies), 1),
+                'p50_ms': round(percentile(latencies, 0.50), 1),
+                'p95_ms': round(percentile(latencies, 0.95), 1),
+                'p99_ms': round(percentile(latencies, 0.99), 1),
+            }
+        return results
+
+    def handle(self, *args, **options):
+        if options['rate'] <= 0 or options['duration'] <= 0 or options['concurrency'] < 1:
+            raise CommandError('--rate, --duration and --concurrency must be positive')
+        url = urlsplit(options['url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('--url must be an http:// URL')
+        host, port = url.hostname, url.port or 80
+
+        async def fetch_products():
+            connection = Connection(host, port)
+            try:
+                status, content = await connection.request('GET', '/api/products/')
+            finally:
+                connection.close()
+            if status != 200:
+                raise CommandError(f'GET /api/products/ returned {status}')
+            return [p['name'] for p in json.loads(content)] or ['Unknown']
+
+        started = datetime.now()
+        try:
+            products = asyncio.run(fetch_products())
+        except OSError as e:
+            raise CommandError(f'Cannot reach {options["url"]}: {e}')
+        samples, elapsed = asyncio.run(self._run(options, host, port, products))
+        results = self._summarize(samples, elapsed)
+
+        self.stdout.write(
+            f'{"scenario":<9} {"requests":>8} {"req/s":>7} {"errors":>7} {"locked":>7} '
+            f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8}')
+        for name, r in results.items():
+            self.stdout.write(
+                f'{name:<9} {r["requests"]:>8} {r["throughput"]:>7.1f} {r["error_rate"]:>7.1%} '
+                f'{r["locked_rate"]:>7.1%} {r["p50_ms"]:>8.1f} {r["p95_ms"]:>8.1f} {r["p99_ms"]:>8.1f}')
+
+        if options['output']:
+            report = {
+                'label': options['label'],
+                'started': started.isoformat(timespec='seconds'),
+                'config': {key: options[key] for key in
+                           ('url', 'rate', 'duration', 'concurrency', 'mix', 'seed')},
+                'elapsed': round(elapsed, 2),
+                'results': results,
+            }
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import maintenance, stores
+
+
+class Command(BaseCommand):
+    help = 'Vacuum free pages, refresh planner statistics and check the database integrity.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--store', default=stores.MAIN, choices=stores.names() + [stores.ALL],
+            help='Store to maintain, or "all" (default: main).')
+        parser.add_argument(
+            '--full-check', action='store_true',
+            help='Run the full integrity_check instead of quick_check.')
+
+    def handle(self, *args, **options):
+        names = stores.names() if options['store'] == stores.ALL else [options['store']]
+        failed = []
+        for store in names:
+            record = maintenance.run(store, options['full_check'])
+            before, after = record['before'], record['after']
+            self.stdout.write(
+                f'{store}: {before["size"]} -> {after["size"]} bytes, freed {record["pages_freed"]} '
+                f'pages in {record["vacuum_steps"]} steps, {after["freelist_count"]} still free, '
+                f'{record["check"]} {record["integrity"]}, {record["duration_s"]:.2f}s'
+                + (' (converted to incremental vacuum)' if record['converted_to_incremental'] else ''))
+            if record['integrity'] != 'ok':
+                failed.append(store)
+        if failed:
+            raise CommandError(f'Integrity check failed for: {", ".join(failed)}')
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = 'Copy the live database to ANALYTICS_SNAPSHOT for the analytics connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--every', type=float,
+            help='Keep running and refresh the snapshot every this many seconds.')
+
+    def refresh(self, source, snapshot):
+        started = time.perf_counter()
+        partial = f'{snapshot}.partial'
+        with sqlite3.connect(source) as src, sqlite3.connect(partial) as dst:
+            src.backup(dst)
+        dst.close()
+        src.close()
+        # Swap the finished copy in atomically; connections already reading
+        # the old snapshot keep their file until they close it.
+        os.replace(partial, snapshot)
+        self.stdout.write(
+            f'Refreshed {snapshot} in {time.perf_counter() - started:.2f}s')
+
+    def handle(self, *args, **options):
+        snapshot = settings.ANALYTICS_SNAPSHOT
+        if not snapshot:
+            raise CommandError('ANALYTICS_SNAPSHOT is not set.')
+        source = connections['default'].settings_dict['NAME']
+
+        self.refresh(source, snapshot)
+        while options['every']:
+            time.sleep(options['every'])
+            self.refresh(source, snapshot)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend import backups, stores
+
+
+class Command(BaseCommand):
+    help = 'Verify a backup and copy it over the live database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('backup', help='Backup id or file name in BACKUP_DIR, or "latest".')
+        parser.add_argument(
+            '--store', choices=stores.names(),
+            help="Store to restore into (default: the backup's own; with \"latest\", main).")
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only verify the checksum, without restoring.')
+        parser.add_argument(
+            '--noinput', '--no-input', action='store_false', dest='interactive',
+            help='Do not ask for confirmation.')
+
+    def handle(self, *args, **options):
+        search = options['store']
+        if options['backup'] == 'latest':
+            search = search or stores.MAIN
+        try:
+            manifest = backups.find(options['backup'], search)
+            backups.verify(manifest)
+        except FileNotFoundError:
+            raise CommandError(f'No backup named {options["backup"]} in the backup directory.')
+        except backups.BackupError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'{manifest["file"]}: checksum OK (taken {manifest["finished"]})')
+        if options['check']:
+            return
+
+        store = options['store'] or manifest['store']
+        if options['interactive']:
+            answer = input(f'Replace the live {store} database with this backup? [y/N] ')
+            if answer.strip().lower() not in ('y', 'yes'):
+                raise CommandError('Restore cancelled.')
+        try:
+            version = backups.restore(manifest, store)
+        except backups.BackupError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f'Restored {store} from {manifest["file"]}; data version is now {version}.')
@@ -0,0 +1,106 @@
+import threading
+import time
+from urllib.error import URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from backend import boot, maintenance, stores
+
+SERVER_MODES = ['runserver', 'asgi', 'wsgi']
+
+
+def run_gunicorn(mode, bind):
+    from gunicorn.app.base import BaseApplication
+
+    if mode == 'asgi':
+        from AmandaLynnDashboard.asgi import application
+        worker_options = {'worker_class': 'uvicorn.workers.UvicornWorker'}
+    else:
+        from AmandaLynnDashboard.wsgi import application
+        worker_options = {'worker_class': 'gthread', 'threads': settings.SERVER_THREADS}
+
+    class DashboardServer(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': bind,
+                'workers': settings.SERVER_WORKERS,
+                'timeout': settings.SERVER_TIMEOUT,
+                'accesslog': '-',
+                **worker_options,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    DashboardServer().run()
+
+
+class Command(BaseCommand):
+    help = (
+        'Start the backend for production use: migrate only when the migration '
+        'files changed since the last run, then serve and report time-to-ready.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'addrport', nargs='?', default='0.0.0.0:8000',
+            help='Address and port to listen on.')
+        parser.add_argument(
+            '--mode', choices=SERVER_MODES, default=settings.SERVER_MODE,
+            help='Server to run (default: the SERVER_MODE setting).')
+
+    def _probe_first_request(self, port):
+        url = f'http://127.0.0.1:{port}/api/ready/'
+        while True:
+            try:
+                with urlopen(url, timeout=5) as response:
+                    if response.status == 200:
+                        break
+            except (URLError, OSError):
+                pass
+            time.sleep(0.05)
+
+        boot.timings['first_request'] = boot.since_start()
+        boot.ready.set()
+        self.stdout.write(
+            'Ready in {first_request:.2f}s (import {import:.2f}s, '
+            'migration check {migration_check:.2f}s, migrate {migrate:.2f}s)'.format(**boot.timings))
+
+    def handle(self, *args, **options):
+        boot.timings['import'] = boot.since_start()
+
+        started = time.perf_counter()
+        outdated = [alias for alias in stores.aliases() if not boot.migrations_current(alias)]
+        boot.timings['migration_check'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for alias in outdated:
+            call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
+            boot.record_migrations(alias)
+        boot.timings['migrate'] = time.perf_counter() - started
+
+        # In this process, not the workers, so one scheduler covers the server.
+        try:
+            maintenance.start_scheduler()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        port = options['addrport'].rpartition(':')[2]
+        threading.Thread(target=self._probe_first_request, args=(port,), daemon=True).start()
+
+        if options['mode'] == 'runserver':
+            call_command('runserver', options['addrport'], use_reloader=False)
+        else:
+            # The app is loaded here and workers are forked from this
+            # process; don't let them inherit the migration check's connection.
+            connections.close_all()
+            try:
+                run_gunicorn(options['mode'], options['addrport'])
+            except ImportError as e:
+                raise CommandError(f'SERVER_MODE={options["mode"]} needs gunicorn and uvicorn installed: {e}')
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.25 on 2026-10-19 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0003_product_is_retired'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedExpense',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('date', models.DateField(db_index=True)),
+                ('type', models.CharField(max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('date', models.DateField(db_index=True)),
+                ('type', models.CharField(max_length=50)),
+                ('products', models.TextField()),
+            ],
+        ),
+    ]
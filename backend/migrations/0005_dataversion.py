@@ -0,0 +1,20 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0004_archivedexpense_archivedtransaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
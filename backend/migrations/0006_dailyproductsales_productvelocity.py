@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0005_dataversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductVelocity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='velocity', serialize=False, to='backend.product')),
+                ('sold_30d', models.IntegerField(default=0)),
+                ('sold_90d', models.IntegerField(default=0)),
+                ('units_per_day', models.FloatField(default=0)),
+                ('reorder_point', models.IntegerField(default=0)),
+                ('days_of_cover', models.FloatField(db_index=True, null=True)),
+                ('computed_on', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='backend.product')),
+            ],
+            options={
+                'unique_together': {('product', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:10
+
+from django.db import migrations, models
+
+
+def start_log_at_current_version(apps, schema_editor):
+    # Nothing before now was logged, so earlier versions need a full sync.
+    DataVersion = apps.get_model('backend', 'DataVersion')
+    DataVersion.objects.using(schema_editor.connection.alias).update(
+        compacted_through=models.F('version'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0006_dailyproductsales_productvelocity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('table', models.CharField(max_length=50)),
+                ('row_id', models.IntegerField()),
+                ('op', models.CharField(max_length=10)),
+                ('version', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='dataversion',
+            name='compacted_through',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['table', 'version'], name='backend_cha_table_756c1b_idx'),
+        ),
+        migrations.RunPython(start_log_at_current_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:29
+
+import backend.money
+from django.db import migrations
+
+MONEY_COLUMNS = [
+    ('backend_archivedexpense', 'price'),
+    ('backend_archivedtransaction', 'total'),
+    ('backend_expense', 'price'),
+    ('backend_product', 'price'),
+    ('backend_transaction', 'total'),
+]
+
+
+def convert(table, column):
+    # Existing amounts are decimal numbers (REAL or TEXT); ROUND absorbs
+    # binary float error such as 19.99 * 100 = 1998.9999999999998.
+    return migrations.RunSQL(
+        f'UPDATE {table} SET {column} = CAST(ROUND({column} * 100) AS INTEGER)',
+        f'UPDATE {table} SET {column} = {column} / 100.0',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_changelog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedexpense',
+            name='price',
+            field=backend.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='archivedtransaction',
+            name='total',
+            field=backend.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='expense',
+            name='price',
+            field=backend.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='price',
+            field=backend.money.MoneyField(),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='total',
+            field=backend.money.MoneyField(),
+        ),
+    ] + [convert(table, column) for table, column in MONEY_COLUMNS]
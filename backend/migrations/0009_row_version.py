@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0008_money_in_cents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedexpense',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='archivedtransaction',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-19 16:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_row_version'),
+    ]
+
+    operations = [
+        # The single version row exists from the start, so concurrent first
+        # writes all update it instead of racing to create it.
+        migrations.RunSQL(
+            'INSERT OR IGNORE INTO backend_dataversion (id, version, compacted_through) VALUES (1, 0, 0)',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,35 +1,134 @@
-from django.db import models
+from django.db import models, router, transaction
 
+from .money import MoneyField
 
-class Product(models.Model):
+
+class LoggedModel(models.Model):
+    """
+    A model whose writes are counted in the data version and the change log.
+
+    Model.save() sends post_save after its own write has committed; here
+    the save and its post_save handlers share one transaction, so a row,
+    the version it bumps and its change log entry commit together (delete()
+    already sends post_delete inside its transaction).
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class Product(LoggedModel):
     id = models.AutoField(primary_key=True)
     name = models.CharField(
         max_length=100, default="MyProduct")
     stock = models.IntegerField()
-    price = models.DecimalField(
-        max_digits=10, decimal_places=2)
+    price = MoneyField()
     number_sold = models.IntegerField(default=0)
     is_retired = models.BooleanField(default=False)
+    # Goes up by one with every update; PATCHes name the version they edit.
+    version = models.IntegerField(default=1)
 
 
-class Expense(models.Model):
+class Expense(LoggedModel):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
     date = models.DateField()
     type = models.CharField(max_length=50)
-    price = models.DecimalField(
-        max_digits=10, decimal_places=2)
+    price = MoneyField()
+    version = models.IntegerField(default=1)
 
 
-class Transaction(models.Model):
+class Transaction(LoggedModel):
     id = models.AutoField(primary_key=True)
-    total = models.DecimalField(max_digits=10, decimal_places=2)
+    total = MoneyField()
     date = models.DateField()
     type = models.CharField(max_length=50)
     products = models.TextField()
+    version = models.IntegerField(default=1)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not {'date', 'products'} & instance.get_deferred_fields():
+            # The sale as loaded, so backend.stock can apply an edit without
+            # reading the row again inside the write's transaction.
+            instance._loaded_sale = (instance.date, instance.products)
+        return instance
 
 
 class TransactionProduct(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+
+
+# Archived rows keep their original ids and the same columns (in the same
+# order) as the hot tables, so the two can be combined with a UNION.
+class ArchivedExpense(models.Model):
+    id = models.IntegerField(primary_key=True)
+    name = models.CharField(max_length=100)
+    date = models.DateField(db_index=True)
+    type = models.CharField(max_length=50)
+    price = MoneyField()
+    version = models.IntegerField(default=1)
+
+
+class ArchivedTransaction(models.Model):
+    id = models.IntegerField(primary_key=True)
+    total = MoneyField()
+    date = models.DateField(db_index=True)
+    type = models.CharField(max_length=50)
+    products = models.TextField()
+    version = models.IntegerField(default=1)
+
+
+# Single row counting writes to the tables above, used to tell whether
+# results computed from them are still current.
+class DataVersion(models.Model):
+    id = models.AutoField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+    # ChangeLog entries up to this version have been dropped; delta syncs
+    # from before it have to start over.
+    compacted_through = models.BigIntegerField(default=0)
+
+
+# Units sold per product per day over the recent past, adjusted as
+# transactions are written (see backend.stock).
+class DailyProductSales(models.Model):
+    id = models.AutoField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    date = models.DateField()
+    units = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = [('product', 'date')]
+
+
+class ProductVelocity(models.Model):
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name='velocity')
+    sold_30d = models.IntegerField(default=0)
+    sold_90d = models.IntegerField(default=0)
+    units_per_day = models.FloatField(default=0)
+    reorder_point = models.IntegerField(default=0)
+    # Days until stock runs out at the current velocity; null when the
+    # product is not selling.
+    days_of_cover = models.FloatField(null=True, db_index=True)
+    computed_on = models.DateField()
+
+
+# One row per save or delete of a listed row, for `?since=` delta syncs.
+class ChangeLog(models.Model):
+    id = models.AutoField(primary_key=True)
+    table = models.CharField(max_length=50)
+    row_id = models.IntegerField()
+    op = models.CharField(max_length=10)
+    version = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['table', 'version'])]
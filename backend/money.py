@@ -0,0 +1,82 @@
+"""
+Money amounts: Decimals with two places in Python, integer cents in the
+database.
+
+MoneyField converts at the database boundary, so `SUM()` and comparisons
+run on exact integers in SQL while models, `values()` rows, the API and
+exports keep seeing Decimal('12.50'). Aggregates that ask for a
+BigIntegerField output get the raw cents instead, for the graph code.
+"""
+from decimal import Decimal
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models import lookups
+
+CENT = Decimal('0.01')
+
+# Largest amount accepted, as the decimal columns allowed before cents
+# (max_digits=10). Sums of many amounts still fit SQLite's 64-bit integers.
+MAX_AMOUNT = Decimal('99999999.99')
+
+
+def parse(value):
+    """
+    The amount in `value` (a number, or a string optionally starting with
+    '$') as a two-place Decimal. Raises ValueError for anything else,
+    including fractions of a cent and amounts beyond MAX_AMOUNT.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid amount: {value}')
+    if isinstance(value, float):
+        # The shortest repr, so 0.1 is 0.1 and not 0.1000000000000000055...
+        value = repr(value)
+    try:
+        amount = Decimal(str(value).strip().lstrip('$'))
+        if not amount.is_finite() or amount != amount.quantize(CENT):
+            raise ValueError(f'Invalid amount: {value}')
+        amount = amount.quantize(CENT)
+    except ArithmeticError:
+        # InvalidOperation, also from quantizing exponents like 1e30.
+        raise ValueError(f'Invalid amount: {value}')
+    if abs(amount) > MAX_AMOUNT:
+        raise ValueError(f'Amount must be at most {MAX_AMOUNT}: {value}')
+    return amount
+
+
+def to_cents(value):
+    return int(parse(value) * 100)
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class MoneyField(models.BigIntegerField):
+    description = 'Amount of money, stored in cents'
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else from_cents(value)
+
+    def to_python(self, value):
+        if value is None:
+            return None
+        try:
+            return parse(value)
+        except ValueError as e:
+            raise ValidationError(str(e), code='invalid')
+
+    def get_prep_value(self, value):
+        return None if value is None else to_cents(value)
+
+    def formfield(self, **kwargs):
+        return forms.DecimalField(**{'decimal_places': 2, **kwargs})
+
+
+@MoneyField.register_lookup
+class MoneyIContains(lookups.IContains):
+    # Searches match the amount as displayed ('12.50'), not the stored cents.
+    def process_lhs(self, compiler, connection, lhs=None):
+        sql, params = super().process_lhs(compiler, connection, lhs)
+        return f"printf('%%.2f', {sql} / 100.0)", params
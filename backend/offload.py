@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connections
+from django.views import View
+
+from .profiling import profile_thread
+
+# Under ASGI, Django 3.2 runs every sync view on one shared thread per
+# process. Graphs and exports are pushed onto this pool instead so a slow
+# report never queues the CRUD endpoints behind it.
+_executor = ThreadPoolExecutor(
+    max_workers=settings.OFFLOAD_THREADS, thread_name_prefix='offload')
+
+
+def _run_and_close(func, args, kwargs):
+    try:
+        with profile_thread():
+            return func(*args, **kwargs)
+    finally:
+        # Pool threads outlive the request, so release the connections the
+        # work opened here rather than leaving one per thread behind.
+        connections.close_all()
+
+
+async def offload(func, *args, **kwargs):
+    """Run the blocking `func` on the offload pool, keeping the caller's context."""
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _executor,
+        functools.partial(context.run, _run_and_close, func, args, kwargs))
+
+
+class AsyncView(View):
+    """
+    A View whose handlers are `async def`. Django 3.2 only treats a view as
+    async when the callable from as_view() is a coroutine function, so mark
+    it as one (as Django 4.1+ does itself).
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view._is_coroutine = asyncio.coroutines._is_coroutine
+        return view
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    Django 3.2 iterates streaming responses directly on the event loop, so a
+    body generated from a queryset would make ORM calls from async code (and
+    block every other request while it did). Pull each part on the sync
+    thread the view ran on instead.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        response_headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            response_headers.append((bytes(header), bytes(value)))
+        for c in response.cookies.values():
+            response_headers.append(
+                (b'Set-Cookie', c.output(header='').encode('ascii').strip()))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': response_headers,
+        })
+
+        parts = iter(response)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while (part := await next_part(parts, None)) is not None:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
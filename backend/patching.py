@@ -0,0 +1,68 @@
+"""
+Partial updates (PATCH) with optimistic concurrency.
+
+Products, expenses and transactions carry a row `version` that goes up by
+one with every update. A PATCH names the version it was based on and is
+applied as one `UPDATE ... WHERE id = %s AND version = %s` of just the
+submitted columns. If another write got there first, nothing matches and
+the caller answers 409 with the row as it is now.
+
+QuerySet.update() sends no signals, so `apply` sends post_save for the
+updated row itself; the data version, change log, live events and sales
+figures then stay current exactly as they do for save().
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+
+from .models import Transaction
+from . import stores
+
+
+class Conflict(Exception):
+    def __init__(self, current):
+        self.current = current
+        super().__init__(f'Row {current.pk} is at version {current.version}')
+
+
+def bump_row_version(sender, instance, **kwargs):
+    # pre_save of the versioned models, so full saves (PUT, the admin, ...)
+    # also invalidate PATCHes based on the previous version.
+    if not instance._state.adding:
+        instance.version += 1
+
+
+def row(instance):
+    """The row's columns, as the list endpoints' `values()` give them."""
+    return {f.attname: getattr(instance, f.attname) for f in instance._meta.concrete_fields}
+
+
+def apply(model, pk, version, fields):
+    """
+    Write `fields` to row `pk` of `model` if it is still at `version`, and
+    return the updated instance. Raises model.DoesNotExist, or Conflict
+    holding the current row.
+    """
+    alias = stores.alias()
+    with transaction.atomic(using=alias):
+        if model is Transaction and fields.keys() & {'date', 'products'}:
+            # What the sales figures have to take back out of the old sale.
+            previous_sale = Transaction.objects.filter(pk=pk, version=version).values_list(
+                'date', 'products').first()
+        else:
+            previous_sale = None
+
+        updated = model.objects.filter(pk=pk, version=version).update(
+            version=F('version') + 1, **fields)
+        instance = model.objects.filter(pk=pk).first()
+        if instance is None:
+            raise model.DoesNotExist(f'{model.__name__} matching query does not exist.')
+        if not updated:
+            raise Conflict(instance)
+
+        if model is Transaction:
+            # An unchanged sale leaves the sales figures as they are.
+            instance._previous_sale = previous_sale or (instance.date, instance.products)
+        post_save.send(sender=model, instance=instance, created=False, raw=False,
+                       using=alias, update_fields=frozenset(fields) | {'version'})
+    return instance
@@ -0,0 +1,175 @@
+"""
+On-demand profiling of single requests.
+
+With PROFILING_ENABLED set, a request sent with an `X-Profile: 1` header or
+a `profile=true` query parameter runs under cProfile and tracemalloc. The
+profile is written to PROFILING_DIR with a JSON summary, keeping only the
+newest PROFILING_KEEP, and both are served by /api/debug/profiles/. With
+the setting off the middleware removes itself from the stack.
+
+Work the request hands to the offload pool (graphs, exports) is profiled
+in that thread too and merged into the same report.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+TOP_ALLOCATIONS = 20
+
+# Profiled requests run one at a time: tracemalloc is process-wide, so
+# two at once would report each other's allocations.
+_lock = threading.Lock()
+
+_session = ContextVar('profiling_session', default=None)
+
+
+def profile_requested(request):
+    return (request.headers.get('X-Profile', '').lower() in ('1', 'true')
+            or request.GET.get('profile', 'false').lower() == 'true')
+
+
+@contextmanager
+def profile_thread():
+    """Profile the block if it runs on behalf of a profiled request."""
+    profilers = _session.get()
+    if profilers is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profilers.append(profiler)
+
+
+def _directory():
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    return settings.PROFILING_DIR
+
+
+def _trim(directory):
+    reports = sorted(name[:-5] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in reports[:-settings.PROFILING_KEEP]:
+        for suffix in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except OSError:
+                pass
+
+
+def _save(profilers, summary):
+    directory = _directory()
+    stats = pstats.Stats(profilers[0])
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    stats.dump_stats(os.path.join(directory, summary['id'] + '.prof'))
+    # Written last and renamed into place: a listed report is complete.
+    path = os.path.join(directory, summary['id'] + '.json')
+    with open(path + '.partial', 'w') as f:
+        json.dump(summary, f)
+    os.replace(path + '.partial', path)
+    _trim(directory)
+
+
+def list_profiles():
+    directory = _directory()
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                summaries.append(json.load(f))
+    return summaries
+
+
+def top_functions(profile_id, limit=25, sort='cumulative'):
+    """
+    The `limit` most expensive functions of a stored profile. Raises
+    FileNotFoundError for unknown (or already rotated out) ids.
+    """
+    if os.path.basename(profile_id) != profile_id:
+        raise FileNotFoundError(profile_id)
+    path = os.path.join(_directory(), profile_id + '.prof')
+    if not os.path.exists(path):
+        raise FileNotFoundError(profile_id)
+    stats = pstats.Stats(path)
+    stats.sort_stats(sort)
+    functions = []
+    for func in stats.fcn_list[:limit]:
+        primitive_calls, calls, total_time, cumulative_time, _ = stats.stats[func]
+        filename, line, name = func
+        functions.append({
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'primitive_calls': primitive_calls,
+            'total_time': round(total_time, 6),
+            'cumulative_time': round(cumulative_time, 6),
+        })
+    return functions
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request) or not _lock.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return self._profile(request)
+        finally:
+            _lock.release()
+
+    def _profile(self, request):
+        profile_id = f'{int(time.time() * 1000)}-{uuid.uuid4().hex[:6]}'
+        profilers = []
+        token = _session.set(profilers)
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        started = datetime.now()
+        start = time.perf_counter()
+        try:
+            with profile_thread():
+                response = self.get_response(request)
+            duration = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+            _session.reset(token)
+
+        allocations = [{
+            'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size': stat.size,
+            'count': stat.count,
+        } for stat in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]]
+        _save(profilers, {
+            'id': profile_id,
+            'started': started.isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'peak_memory_bytes': peak,
+            'top_allocations': allocations,
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
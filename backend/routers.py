@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from . import stores
+
+_analytics_reads = ContextVar('analytics_reads', default=False)
+
+
+@contextmanager
+def analytics_reads():
+    """Route every ORM read made inside the block to the analytics database."""
+    token = _analytics_reads.set(True)
+    try:
+        yield
+    finally:
+        _analytics_reads.reset(token)
+
+
+class AnalyticsRouter:
+    """
+    Sends reads made inside `analytics_reads()` (graphs, comparisons,
+    exports) to the read-only analytics connection. Everything else,
+    including all writes, stays on the default database. With STORES set,
+    both are those of the store the request selected (see backend.stores).
+
+    The separate connection keeps analytics from writing, not from
+    blocking writers: the database uses a rollback journal, so while an
+    analytics query reads the live file its shared lock still holds up
+    commits, which fail with `database is locked` once the busy timeout
+    runs out. Only ANALYTICS_SNAPSHOT, a separate file, keeps long reports
+    off the file the register writes to.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _analytics_reads.get():
+            return stores.analytics_alias()
+        return stores.alias()
+
+    def db_for_write(self, model, **hints):
+        return stores.alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in stores.analytics_aliases()
+
+
+def set_query_only(sender, connection, **kwargs):
+    # mode=ro already refuses writes at the file level; query_only also
+    # stops the connection from attempting them (e.g. schema changes).
+    if connection.alias in stores.analytics_aliases():
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA query_only = ON')
@@ -0,0 +1,259 @@
+"""
+Declarative validation of the JSON bodies of the create and update views.
+
+A Schema subclass lists its fields. `compile()` turns it, once at import,
+into a Validator holding a `__slots__` dataclass and a flat list of
+converters, so checking a request is one json.loads() and one pass over
+that list. Every bad field is reported at once (as SchemaError.errors)
+and the view rejects the request before running any query.
+"""
+from dataclasses import make_dataclass
+from datetime import date
+import json
+import re
+
+from . import money
+
+# Largest request body accepted by the write views.
+MAX_BODY_BYTES = 64 * 1024
+
+# Default limit on the length of list fields.
+MAX_ITEMS = 100
+
+# Default bounds of integer fields: what an SQLite INTEGER column holds.
+MIN_INTEGER = -2 ** 63
+MAX_INTEGER = 2 ** 63 - 1
+
+WHOLE_NUMBER = re.compile(r'-?[0-9]+')
+
+
+class _Unset:
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'UNSET'
+
+    def __bool__(self):
+        return False
+
+
+# Value of fields left out of a partial (update) request.
+UNSET = _Unset()
+
+
+class SchemaError(ValueError):
+    def __init__(self, errors, status=400):
+        self.errors = errors
+        self.status = status
+        super().__init__('; '.join(f'{field}: {message}' for field, message in errors.items()))
+
+
+class Field:
+    def __init__(self, required=True, default=UNSET):
+        self.required = required and default is UNSET
+        self.default = default
+
+    def convert(self, value):
+        """The validated value; raises ValueError with a message for the client."""
+        return value
+
+
+class String(Field):
+    def __init__(self, max_length, allow_blank=False, **kwargs):
+        super().__init__(**kwargs)
+        self.max_length = max_length
+        self.allow_blank = allow_blank
+
+    def convert(self, value):
+        if not isinstance(value, str):
+            raise ValueError('Must be a string')
+        value = value.strip()
+        if not value and not self.allow_blank:
+            raise ValueError('Must not be blank')
+        if len(value) > self.max_length:
+            raise ValueError(f'Must be at most {self.max_length} characters')
+        return value
+
+
+class Integer(Field):
+    def __init__(self, min_value=MIN_INTEGER, max_value=MAX_INTEGER, **kwargs):
+        super().__init__(**kwargs)
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def convert(self, value):
+        # Form inputs send numbers as strings; booleans are not numbers.
+        if isinstance(value, str) and WHOLE_NUMBER.fullmatch(value.strip()):
+            value = int(value)
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError('Must be a whole number')
+        if self.min_value is not None and value < self.min_value:
+            raise ValueError(f'Must be at least {self.min_value}')
+        if self.max_value is not None and value > self.max_value:
+            raise ValueError(f'Must be at most {self.max_value}')
+        return value
+
+
+class Boolean(Field):
+    def convert(self, value):
+        if isinstance(value, str) and value.lower() in ('true', 'false'):
+            return value.lower() == 'true'
+        if not isinstance(value, bool):
+            raise ValueError('Must be true or false')
+        return value
+
+
+class Money(Field):
+    def convert(self, value):
+        try:
+            return money.parse(value)
+        except (ValueError, ArithmeticError):
+            raise ValueError(f'Must be an amount with at most two decimal places, '
+                             f'up to {money.MAX_AMOUNT}')
+
+
+class Date(Field):
+    def convert(self, value):
+        try:
+            return date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError('Must be a date formatted YYYY-MM-DD')
+
+
+class StringList(Field):
+    """A list of strings, or one comma-separated string; blank entries are dropped."""
+
+    def __init__(self, max_length, max_items=MAX_ITEMS, **kwargs):
+        super().__init__(**kwargs)
+        self.max_length = max_length
+        self.max_items = max_items
+
+    def convert(self, value):
+        if isinstance(value, str):
+            value = value.split(',')
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ValueError('Must be a list of strings')
+        items = [item.strip() for item in value if item.strip()]
+        if len(items) > self.max_items:
+            raise ValueError(f'Must have at most {self.max_items} entries')
+        if any(len(item) > self.max_length for item in items):
+            raise ValueError(f'Entries must be at most {self.max_length} characters')
+        return items
+
+
+class Validator:
+    def __init__(self, name, fields, partial, required=()):
+        self.record = make_dataclass(name, list(fields), slots=True)
+        self.steps = [
+            (field_name, field.convert,
+             field_name in required if partial else field.required,
+             UNSET if partial else field.default)
+            for field_name, field in fields.items()
+        ]
+
+    def validate(self, data):
+        """A record of the fields of the dict `data`. Raises SchemaError."""
+        if not isinstance(data, dict):
+            raise SchemaError({'body': 'Must be a JSON object'})
+        values = {}
+        errors = {}
+        for name, convert, required, default in self.steps:
+            if name not in data:
+                if required:
+                    errors[name] = 'Missing field'
+                values[name] = default
+                continue
+            try:
+                values[name] = convert(data[name])
+            except ValueError as e:
+                errors[name] = str(e)
+        if errors:
+            raise SchemaError(errors)
+        return self.record(**values)
+
+    def parse(self, request, max_body_bytes=MAX_BODY_BYTES):
+        """A record of the fields in `request`'s JSON body. Raises SchemaError."""
+        try:
+            declared = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            declared = 0
+        if declared > max_body_bytes or len(request.body) > max_body_bytes:
+            raise SchemaError({'body': f'Must be at most {max_body_bytes} bytes'}, status=413)
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            raise SchemaError({'body': 'Invalid JSON'})
+        return self.validate(data)
+
+
+class Schema:
+    """Base for request schemas; subclasses declare Field attributes."""
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.fields = {}
+        for klass in reversed(cls.__mro__):
+            cls.fields.update(
+                (name, value) for name, value in vars(klass).items() if isinstance(value, Field))
+
+    @classmethod
+    def compile(cls, partial=False, required=()):
+        """
+        A Validator for this schema. With `partial`, left-out fields are
+        UNSET, except those named in `required`.
+        """
+        name = cls.__name__ + ('Partial' if partial else '')
+        return Validator(name, cls.fields, partial, required)
+
+
+def provided(record):
+    """The fields of a partial record that the request set."""
+    return {name: getattr(record, name) for name in record.__slots__
+            if getattr(record, name) is not UNSET}
+
+
+class ProductSchema(Schema):
+    name = String(max_length=100)
+    stock = Integer(min_value=0)
+    price = Money()
+    number_sold = Integer(min_value=0)
+    is_retired = Boolean(default=False)
+
+
+class ExpenseSchema(Schema):
+    name = String(max_length=100)
+    date = Date()
+    type = String(max_length=50)
+    price = Money()
+
+
+class TransactionSchema(Schema):
+    total = Money()
+    date = Date()
+    type = String(max_length=50)
+    products = StringList(max_length=100, default=[])
+
+
+class ProductPatch(ProductSchema):
+    version = Integer(min_value=1)
+
+
+class ExpensePatch(ExpenseSchema):
+    version = Integer(min_value=1)
+
+
+class TransactionPatch(TransactionSchema):
+    version = Integer(min_value=1)
+
+
+PRODUCT_CREATE = ProductSchema.compile()
+PRODUCT_UPDATE = ProductSchema.compile(partial=True)
+EXPENSE_CREATE = ExpenseSchema.compile()
+EXPENSE_UPDATE = ExpenseSchema.compile(partial=True)
+TRANSACTION_CREATE = TransactionSchema.compile()
+TRANSACTION_UPDATE = TransactionSchema.compile(partial=True)
+PRODUCT_PATCH = ProductPatch.compile(partial=True, required=('version',))
+EXPENSE_PATCH = ExpensePatch.compile(partial=True, required=('version',))
+TRANSACTION_PATCH = TransactionPatch.compile(partial=True, required=('version',))
@@ -0,0 +1,143 @@
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from . import stores
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalesce within a process only
+    fcntl = None
+
+# Finished results are kept this long so waiters in other processes can
+# pick them up; older files are removed after each computation.
+RESULT_TTL = 300
+
+metrics = {'computed': 0, 'coalesced_local': 0, 'coalesced_remote': 0}
+_metrics_lock = threading.Lock()
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _count(metric):
+    with _metrics_lock:
+        metrics[metric] += 1
+
+
+def _directory():
+    directory = settings.SINGLEFLIGHT_DIR
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def request_key(namespace, params):
+    payload = json.dumps(
+        [namespace, params, stores.version_key()],
+        sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@contextmanager
+def _process_lock(path):
+    with open(path, 'a+b') as lock:
+        os.utime(path)
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_meta(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_expired(directory):
+    cutoff = time.time() - RESULT_TTL
+    for entry in os.scandir(directory):
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _run_across_processes(key, compute):
+    arrived = time.time()
+    directory = _directory()
+    meta_path = os.path.join(directory, f'{key}.json')
+
+    with _process_lock(os.path.join(directory, f'{key}.lock')):
+        # Another worker process held the lock while it computed the same
+        # request; if it finished after we arrived, share its result.
+        meta = _read_meta(meta_path)
+        if meta is not None and meta['finished'] >= arrived and os.path.exists(meta['path']):
+            _count('coalesced_remote')
+            return meta
+
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.result', delete=False) as out:
+            meta = compute(out)
+        meta.update(path=out.name, finished=time.time())
+        with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.json', delete=False) as f:
+            json.dump(meta, f)
+        os.replace(f.name, meta_path)
+        _count('computed')
+
+    _remove_expired(directory)
+    return meta
+
+
+def coalesce(namespace, params, compute):
+    """
+    Run `compute(out)` once for all concurrent requests with the same
+    namespace, parameters and data version, in this process and in other
+    worker processes.
+
+    `compute` writes the result into the binary file `out` and returns a
+    JSON-serializable dict of metadata. Every caller gets that dict back with
+    `path` set to the result file, which it should open itself.
+    """
+    key = request_key(namespace, params)
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        _count('coalesced_local')
+        if flight.error is not None:
+            raise flight.error
+        return dict(flight.result)
+
+    try:
+        flight.result = _run_across_processes(key, compute)
+        return dict(flight.result)
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
@@ -0,0 +1,224 @@
+"""
+Sales velocity and reorder points for the low-stock alerts.
+
+Units sold per product per day are kept in DailyProductSales and adjusted
+as transactions are saved and deleted, so a product's velocity is
+recomputed from at most LONG_WINDOW_DAYS rows rather than from the
+transaction history. Velocity is the faster of the 30 and 90 day rates,
+so a recent surge raises the reorder point straight away.
+
+The signal handlers run inside the transaction of the write that sent
+them (see LoggedModel), so the sales figures commit or roll back with
+it. They touch only the products named in the sale. The daily roll
+forward of the windows writes too, so it runs from the scheduler in
+backend.maintenance rather than from requests.
+"""
+from collections import Counter
+from datetime import date, timedelta
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import Lower
+
+from .models import Product, Transaction, DailyProductSales, ProductVelocity
+from . import archive
+from . import stores
+
+SHORT_WINDOW_DAYS = 30
+LONG_WINDOW_DAYS = 90
+
+
+def cover_threshold():
+    """Days of cover at or below which a product needs reordering."""
+    return settings.REORDER_LEAD_DAYS + settings.REORDER_SAFETY_DAYS
+
+
+def _as_date(value):
+    # Views assign the request's 'YYYY-MM-DD' string before saving.
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _product_names(products):
+    # Views assign a list before saving; stored rows hold its repr, parsed
+    # the same way as in the timeseries graph.
+    if not isinstance(products, list):
+        products = (products or '').split(',')
+    names = (p.strip().strip("[]'").strip().lower() for p in products)
+    return [n for n in names if n]
+
+
+VELOCITY_FIELDS = [
+    'sold_30d', 'sold_90d', 'units_per_day', 'reorder_point', 'days_of_cover', 'computed_on']
+
+
+def _product_ids(names=None):
+    """{lowercased name: id} of the products named in `names` (all when None)."""
+    products = Product.objects.all()
+    if names is not None:
+        if not names:
+            return {}
+        products = products.annotate(key=Lower('name')).filter(key__in=set(names))
+    return {name.lower(): pk for pk, name in products.values_list('id', 'name')}
+
+
+def _sale_product_ids(*sales):
+    return _product_ids([name for _, products in sales for name in _product_names(products)])
+
+
+def _window_start(today):
+    return today - timedelta(days=LONG_WINDOW_DAYS - 1)
+
+
+def _sale_units(sold_on, products, ids, today):
+    """Counter of {(product_id, date): units} for one transaction."""
+    sold_on = _as_date(sold_on)
+    if sold_on is None or sold_on < _window_start(today):
+        return Counter()
+    return Counter((ids[name], sold_on) for name in _product_names(products) if name in ids)
+
+
+def _apply(changes):
+    for (product_id, sold_on), units in changes.items():
+        if units and not DailyProductSales.objects.filter(
+                product_id=product_id, date=sold_on).update(units=F('units') + units):
+            DailyProductSales.objects.create(product_id=product_id, date=sold_on, units=units)
+
+
+def refresh_velocity(product_ids=None, today=None):
+    """Recompute ProductVelocity for `product_ids` (all products when None)."""
+    today = today or date.today()
+    short_start = today - timedelta(days=SHORT_WINDOW_DAYS - 1)
+    products = Product.objects.all()
+    sales = DailyProductSales.objects.filter(date__gte=_window_start(today), date__lte=today)
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+        sales = sales.filter(product_id__in=product_ids)
+    sold = {
+        row['product']: row for row in sales.values('product').annotate(
+            long=Sum('units'), short=Sum('units', filter=Q(date__gte=short_start)))
+    }
+
+    velocities = []
+    for product_id, stock in products.values_list('id', 'stock'):
+        row = sold.get(product_id, {})
+        sold_30d, sold_90d = row.get('short') or 0, row.get('long') or 0
+        units_per_day = max(sold_30d / SHORT_WINDOW_DAYS, sold_90d / LONG_WINDOW_DAYS)
+        if units_per_day > 0:
+            days_of_cover = max(stock, 0) / units_per_day
+        else:
+            days_of_cover = 0.0 if stock <= 0 else None
+        velocities.append(ProductVelocity(
+            product_id=product_id,
+            sold_30d=sold_30d,
+            sold_90d=sold_90d,
+            units_per_day=units_per_day,
+            reorder_point=math.ceil(units_per_day * cover_threshold()),
+            days_of_cover=days_of_cover,
+            computed_on=today,
+        ))
+
+    with transaction.atomic(using=stores.alias()):
+        existing = set(ProductVelocity.objects.filter(
+            product_id__in=[v.product_id for v in velocities]).values_list('product_id', flat=True))
+        ProductVelocity.objects.bulk_update(
+            [v for v in velocities if v.product_id in existing], VELOCITY_FIELDS)
+        ProductVelocity.objects.bulk_create(
+            [v for v in velocities if v.product_id not in existing])
+
+
+def rebuild_sales(today=None):
+    """
+    Recount DailyProductSales from the transactions (including archived
+    ones) in the velocity window and refresh every product. Used after bulk
+    writes that bypass model signals.
+    """
+    today = today or date.today()
+    start = _window_start(today)
+    ids = _product_ids()
+    changes = Counter()
+    for source in archive.sources(Transaction, start):
+        for sold_on, products in source.filter(date__gte=start).values_list('date', 'products').iterator():
+            changes.update(_sale_units(sold_on, products, ids, today))
+
+    with transaction.atomic(using=stores.alias()):
+        DailyProductSales.objects.all().delete()
+        DailyProductSales.objects.bulk_create(
+            [DailyProductSales(product_id=product_id, date=sold_on, units=units)
+             for (product_id, sold_on), units in changes.items()])
+        refresh_velocity(today=today)
+
+
+def ensure_current(today=None):
+    """
+    Move the velocity windows forward to `today`; they move each day even
+    when nothing is written. Called by the maintenance scheduler.
+    """
+    today = today or date.today()
+    with transaction.atomic(using=stores.alias()):
+        if not ProductVelocity.objects.exists():
+            if Product.objects.exists():
+                rebuild_sales(today)
+            return
+        stale = ProductVelocity.objects.filter(computed_on__lt=today)
+        if stale.exists():
+            DailyProductSales.objects.filter(date__lt=_window_start(today)).delete()
+            refresh_velocity(list(stale.values_list('product_id', flat=True)), today)
+        missing = Product.objects.filter(velocity__isnull=True)
+        if missing.exists():
+            refresh_velocity(list(missing.values_list('id', flat=True)), today)
+
+
+def low_stock():
+    """Non-retired products at or below their reorder point, fewest days of cover first."""
+    return (ProductVelocity.objects
+            .filter(days_of_cover__lte=cover_threshold(), product__is_retired=False)
+            .select_related('product')
+            .order_by('days_of_cover'))
+
+
+# Signal handlers, connected in apps.ready().
+
+def remember_previous_sale(sender, instance, **kwargs):
+    # pre_save on Transaction: keep what the row held so post_save can
+    # apply the difference. A loaded row already knows; reading it here
+    # would take a read lock that SQLite can't upgrade while another
+    # connection is writing.
+    instance._previous_sale = None
+    if instance.pk is not None:
+        instance._previous_sale = getattr(instance, '_loaded_sale', None)
+        if instance._previous_sale is None:
+            instance._previous_sale = Transaction.objects.filter(pk=instance.pk).values_list(
+                'date', 'products').first()
+
+
+def record_sale(sender, instance, **kwargs):
+    today = date.today()
+    sale = (instance.date, instance.products)
+    instance._loaded_sale = sale
+    previous = getattr(instance, '_previous_sale', None)
+    ids = _sale_product_ids(sale, *([previous] if previous is not None else []))
+    changes = _sale_units(*sale, ids, today)
+    if previous is not None:
+        changes.subtract(_sale_units(*previous, ids, today))
+    if any(changes.values()):
+        _apply(changes)
+        refresh_velocity({product_id for (product_id, _), units in changes.items() if units}, today)
+
+
+def remove_sale(sender, instance, **kwargs):
+    today = date.today()
+    sale = (instance.date, instance.products)
+    changes = _sale_units(*sale, _sale_product_ids(sale), today)
+    if changes:
+        _apply(Counter({key: -units for key, units in changes.items()}))
+        refresh_velocity({product_id for product_id, _ in changes}, today)
+
+
+def product_changed(sender, instance, update_fields=None, **kwargs):
+    # Stock changes move days of cover without any new sales.
+    if update_fields is None or 'stock' in update_fields:
+        refresh_velocity([instance.pk])
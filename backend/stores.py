@@ -0,0 +1,181 @@
+"""
+Multi-store mode: one SQLite database per shop location.
+
+The main database is the 'main' store; each name in settings.STORES adds a
+store with its own database file (and read-only analytics connection). A
+request picks its store with an X-Store header or a /stores/<name>/ URL
+prefix, and AnalyticsRouter sends every query to that store's database,
+so each store's writes only contend for its own file.
+
+`X-Store: all` is accepted by the graph and export endpoints, which run
+their queries on every store in parallel and merge the results.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from itertools import chain
+import re
+import threading
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.urls import reverse
+
+MAIN = 'main'
+ALL = 'all'
+URL_PREFIX = re.compile(r'^/stores/(?P<store>[\w-]+)(?P<rest>/.*)$')
+
+# Like analytics_reads(), a ContextVar rather than a thread-local: it
+# follows the request into async views and into offload pool threads.
+_store = ContextVar('store', default=MAIN)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def names():
+    return [MAIN] + list(settings.STORES)
+
+
+def alias(store=None):
+    """Database alias of `store` (default: the current one) for reads and writes."""
+    store = store or _store.get()
+    return 'default' if store in (MAIN, ALL) else f'store_{store}'
+
+
+def aliases():
+    return [alias(store) for store in names()]
+
+
+def analytics_alias(store=None):
+    store = store or _store.get()
+    return 'analytics' if store in (MAIN, ALL) else f'store_{store}_analytics'
+
+
+def analytics_aliases():
+    return {analytics_alias(store) for store in names()}
+
+
+def current():
+    return _store.get()
+
+
+def fanning_out():
+    return _store.get() == ALL
+
+
+@contextmanager
+def use_store(store):
+    if store not in names() and store != ALL:
+        raise KeyError(store)
+    token = _store.set(store)
+    try:
+        yield
+    finally:
+        _store.reset(token)
+
+
+def _run_in_store(store, func, args):
+    try:
+        with use_store(store):
+            return func(*args)
+    finally:
+        # Pool threads outlive the request; don't leave connections open.
+        connections.close_all()
+
+
+def fan_out(func, *args):
+    """
+    Call `func(*args)` once per store, in parallel, each with that store
+    selected (and the caller's other context, e.g. analytics_reads).
+    Returns the results in store order.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(len(names()), thread_name_prefix='stores')
+    futures = [
+        _executor.submit(copy_context().run, _run_in_store, store, func, args)
+        for store in names()
+    ]
+    return [future.result() for future in futures]
+
+
+def gather(queryset):
+    """Rows of `queryset` from every store, one store after another."""
+    return list(chain.from_iterable(fan_out(lambda: list(queryset.all()))))
+
+
+def _add(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a + b
+
+
+def merge_charts(charts, sort_labels=False):
+    """
+    Sum chart.js payloads from several stores: labels are combined and
+    datasets with the same label are added point by point.
+    """
+    charts = [c for c in charts if c]
+    if not charts:
+        return None
+    labels = list(dict.fromkeys(chain.from_iterable(chart['labels'] for chart in charts)))
+    if sort_labels:
+        labels.sort()
+    position = {label: i for i, label in enumerate(labels)}
+
+    datasets = {}
+    for chart in charts:
+        for dataset in chart['datasets']:
+            merged = datasets.setdefault(
+                dataset['label'], {**dataset, 'data': [None] * len(labels)})
+            for label, value in zip(chart['labels'], dataset['data']):
+                i = position[label]
+                merged['data'][i] = _add(merged['data'][i], value)
+    return {**charts[0], 'labels': labels, 'datasets': list(datasets.values())}
+
+
+def version_key():
+    """Identifies the data the current request can see, for result caching."""
+    from .versioning import current_version
+
+    def key():
+        return [current(), current_version(), connections[alias()].settings_dict['NAME']]
+    return fan_out(key) if fanning_out() else key()
+
+
+class StoreMiddleware:
+    """Selects the request's store from the X-Store header or /stores/<name>/ prefix."""
+
+    def __init__(self, get_response):
+        if not settings.STORES:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.fan_out_paths = None
+
+    def __call__(self, request):
+        store = request.headers.get('X-Store')
+        match = URL_PREFIX.match(request.path_info)
+        if match:
+            store = match['store']
+            request.path_info = match['rest']
+        store = (store or MAIN).strip().lower()
+
+        if store == ALL:
+            if self.fan_out_paths is None:
+                self.fan_out_paths = {reverse('graph-list'), reverse('export-data')}
+            if request.path_info not in self.fan_out_paths:
+                return JsonResponse(
+                    {'error': 'All stores can only be requested for graphs and exports'}, status=400)
+        try:
+            with use_store(store):
+                return self.get_response(request)
+        except KeyError as e:
+            if e.args == (store,) and store not in names():
+                return JsonResponse({'error': f'Unknown store: {store}'}, status=404)
+            raise
@@ -0,0 +1,39 @@
+import json
+
+from django.test import SimpleTestCase, TestCase
+
+from backend import analytics
+
+
+class ParameterValidationTests(SimpleTestCase):
+    def test_rejects_non_string_parameters(self):
+        for params in [
+            {'metric': 5},
+            {'metric': 'product_sales', 'products': 5},
+            {'metric': 'product_sales', 'products': ['Mug', 3]},
+            {'granularity': ['month']},
+        ]:
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                analytics.load_metric(params)
+
+    def test_rejects_bad_ranges(self):
+        for params in [{'start': 5}, {'start': '2024-13-01'}, {'start': '2024-03-02', 'end': '2024-03-01'}]:
+            with self.subTest(params=params), self.assertRaises(ValueError):
+                analytics.parse_range(params)
+
+
+class GraphRequestTests(TestCase):
+    def post(self, body):
+        return self.client.post('/api/graphdata/', json.dumps(body), content_type='application/json')
+
+    def test_malformed_requests_get_400(self):
+        for body in [
+            {'graph': 'rolling', 'metric': 5},
+            {'graph': 'rolling', 'metric': 'product_sales', 'products': [1, 2]},
+            {'graph': 'yoy', 'start': '2024-03-02', 'end': '2024-03-01'},
+            {'graph': ['rolling']},
+            {'metric': 'revenue'},
+            ['rolling'],
+        ]:
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
@@ -0,0 +1,45 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from backend import backups
+
+
+@override_settings(BACKUP_MAX_RESTARTS=3, BACKUP_STEP_SLEEP=0)
+class SteppedCopyTests(SimpleTestCase):
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        self.source = os.path.join(scratch.name, 'source.sqlite3')
+        self.target = os.path.join(scratch.name, 'target.sqlite3')
+        with sqlite3.connect(self.source) as db:
+            db.execute('CREATE TABLE t (x TEXT)')
+            db.executemany('INSERT INTO t VALUES (?)', [('x' * 1000,)] * 500)
+
+    def rows(self, path):
+        with sqlite3.connect(path) as db:
+            return db.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+
+    def test_finishes_while_every_step_is_interrupted_by_a_write(self):
+        writer = sqlite3.connect(self.source)
+        self.addCleanup(writer.close)
+
+        def write(seconds):
+            writer.execute("INSERT INTO t VALUES ('y')")
+            writer.commit()
+
+        with mock.patch('backend.backups.time.sleep', side_effect=write) as sleep:
+            backups._copy(self.source, self.target, pages=10)
+
+        self.assertLessEqual(sleep.call_count, 4)
+        self.assertEqual(self.rows(self.target), self.rows(self.source))
+
+    def test_copies_in_steps_without_writes(self):
+        with mock.patch('backend.backups.time.sleep') as sleep:
+            backups._copy(self.source, self.target, pages=10)
+
+        self.assertGreater(sleep.call_count, 10)
+        self.assertEqual(self.rows(self.target), 500)
@@ -0,0 +1,68 @@
+from django.test import TestCase
+
+from backend.changelog import require_full_sync
+from backend.models import Product
+from backend.versioning import bump_version, current_version
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.mug = Product.objects.create(name='Mug', stock=5, price='12.50', number_sold=0)
+        self.bowl = Product.objects.create(name='Bowl', stock=3, price='8.00', number_sold=0)
+        self.vase = Product.objects.create(name='Vase', stock=1, price='30.00', number_sold=0)
+        self.synced = current_version()
+
+    def sync(self, since, **params):
+        response = self.client.get('/api/products/', {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nothing_changed(self):
+        body = self.sync(self.synced)
+        self.assertEqual(body, {'version': self.synced, 'full': False, 'changed': [], 'deleted': []})
+
+    def test_changed_rows_and_tombstones(self):
+        self.mug.stock = 4
+        self.mug.save()
+        bowl_id = self.bowl.pk
+        self.bowl.delete()
+        cup = Product.objects.create(name='Cup', stock=2, price='6.00', number_sold=0)
+
+        body = self.sync(self.synced)
+
+        self.assertFalse(body['full'])
+        self.assertEqual(body['version'], current_version())
+        self.assertEqual({row['id']: row['stock'] for row in body['changed']}, {self.mug.pk: 4, cup.pk: 2})
+        self.assertEqual(body['deleted'], [bowl_id])
+
+    def test_rows_leaving_the_filter_are_tombstoned(self):
+        self.vase.is_retired = True
+        self.vase.save()
+
+        self.assertEqual(self.sync(self.synced)['deleted'], [self.vase.pk])
+        self.assertEqual(self.sync(self.synced, show_retired='true')['deleted'], [])
+
+    def test_tombstones_need_the_id_even_when_fields_are_limited(self):
+        mug_id = self.mug.pk
+        self.mug.delete()
+        self.bowl.stock = 0
+        self.bowl.save()
+
+        body = self.sync(self.synced, fields='stock')
+        self.assertEqual(body['changed'], [{'id': self.bowl.pk, 'stock': 0}])
+        self.assertEqual(body['deleted'], [mug_id])
+
+    def test_falls_back_to_full_sync(self):
+        # As after a bulk write, which the change log doesn't cover.
+        bump_version()
+        require_full_sync()
+        body = self.sync(self.synced)
+        self.assertTrue(body['full'])
+        self.assertEqual(len(body['changed']), 3)
+
+        # A version from the future, e.g. from before a restore.
+        self.assertTrue(self.sync(current_version() + 5)['full'])
+
+    def test_rejects_malformed_since(self):
+        response = self.client.get('/api/products/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
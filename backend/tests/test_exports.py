@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from backend.exports import fetch_in_chunks
+from backend.models import Product
+
+
+class FetchInChunksTests(TransactionTestCase):
+    def setUp(self):
+        Product.objects.bulk_create(
+            Product(name=f'Mug {i}', stock=i, price='5.00', number_sold=0) for i in range(5))
+
+    def test_reads_every_row_in_id_order(self):
+        rows = list(fetch_in_chunks(Product.objects.values('id', 'name'), chunk_size=2))
+        self.assertEqual([row['name'] for row in rows], [f'Mug {i}' for i in range(5)])
+
+    def test_write_succeeds_between_chunks(self):
+        rows = fetch_in_chunks(Product.objects.values('id', 'name'), chunk_size=2)
+        next(rows)
+
+        other = sqlite3.connect(connection.settings_dict['NAME'], uri=True, timeout=0.1)
+        try:
+            other.execute('UPDATE backend_product SET stock = stock + 1')
+            other.commit()
+        finally:
+            other.close()
+
+        self.assertEqual(len(list(rows)), 4)
@@ -0,0 +1,53 @@
+from django.test import TestCase
+
+from backend.importer import import_csv
+from backend.models import Expense, Product
+
+
+def csv_lines(*rows):
+    return [line + '\n' for line in rows]
+
+
+class ImportRowErrorTests(TestCase):
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        lines = csv_lines(
+            'name,date,type,price',
+            'Clay,2024-03-01,Supplies,20.00',
+            'Glaze,2024-03-02,Supplies,1e30',
+            'Kiln,2024-03-03,Equipment,99999999999999999999',
+            'Rent,not-a-date,Rent,500',
+            'Fees,2024-03-04,Fees,',
+            'Brushes,2024-03-05,Supplies,$4.50',
+        )
+        report = import_csv(lines, 'expenses', batch_size=2)
+
+        self.assertEqual(report['imported'], 2)
+        self.assertEqual(report['error_count'], 4)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4, 5, 6])
+        self.assertEqual(sorted(Expense.objects.values_list('name', flat=True)), ['Brushes', 'Clay'])
+
+    def test_out_of_range_integers_are_row_errors(self):
+        lines = csv_lines(
+            'name,stock,price',
+            'Mug,5,12.50',
+            f'Bowl,{10 ** 30},8.00',
+            'Vase,-1,30.00',
+            'Plate,abc,9.00',
+        )
+        report = import_csv(lines, 'products')
+
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4, 5])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Mug'])
+
+    def test_unknown_products_in_transactions_are_row_errors(self):
+        Product.objects.create(name='Mug', stock=5, price='12.50', number_sold=0)
+        lines = csv_lines(
+            'total,date,type,products',
+            '12.50,2024-03-02,Cash,Mug',
+            '3.00,2024-03-02,Cash,Teapot',
+        )
+        report = import_csv(lines, 'transactions')
+
+        self.assertEqual(report['imported'], 1)
+        self.assertEqual(report['errors'], [{'row': 3, 'error': 'Product does not exist: Teapot'}])
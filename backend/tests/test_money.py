@@ -0,0 +1,17 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from backend import money
+
+
+class ParseTests(SimpleTestCase):
+    def test_amounts(self):
+        self.assertEqual(money.parse('$12.5'), Decimal('12.50'))
+        self.assertEqual(money.parse(0.1), Decimal('0.10'))
+        self.assertEqual(money.parse('-99999999.99'), Decimal('-99999999.99'))
+
+    def test_rejects_with_value_error(self):
+        for value in ['1e30', '99999999999999999999', '100000000', '1.001', 'nan', 'abc', True, 1e308]:
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                money.parse(value)
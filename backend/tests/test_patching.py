@@ -0,0 +1,57 @@
+import json
+
+from django.test import TestCase
+
+from backend.models import Expense, Product
+
+
+class PatchTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Mug', stock=5, price='12.50', number_sold=0)
+
+    def patch(self, pk, **fields):
+        return self.client.patch(f'/api/products/update/{pk}/', json.dumps(fields),
+                                 content_type='application/json')
+
+    def test_applies_submitted_fields_and_bumps_version(self):
+        response = self.patch(self.product.pk, version=1, stock=9)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['stock'], 9)
+        self.assertEqual(response.json()['version'], 2)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stock, self.product.price, self.product.version), (9, 12.5, 2))
+
+    def test_stale_version_conflicts_with_current_row(self):
+        self.patch(self.product.pk, version=1, stock=9)
+        response = self.patch(self.product.pk, version=1, price='20.00')
+
+        self.assertEqual(response.status_code, 409)
+        current = response.json()['current']
+        self.assertEqual((current['stock'], current['price'], current['version']), (9, '12.50', 2))
+        self.product.refresh_from_db()
+        self.assertEqual(str(self.product.price), '12.50')
+
+    def test_full_save_invalidates_earlier_versions(self):
+        self.product.stock = 7
+        self.product.save()
+
+        self.assertEqual(self.patch(self.product.pk, version=1, stock=9).status_code, 409)
+        self.assertEqual(self.patch(self.product.pk, version=2, stock=9).status_code, 200)
+
+    def test_missing_row_and_missing_version(self):
+        self.assertEqual(self.patch(self.product.pk + 100, version=1, stock=9).status_code, 404)
+        response = self.patch(self.product.pk, stock=9)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], {'version': 'Missing field'})
+
+    def test_expense_conflict(self):
+        expense = Expense.objects.create(name='Clay', date='2024-03-01', type='Supplies', price='20.00')
+        url = f'/api/expenses/update/{expense.pk}/'
+        first = self.client.patch(url, json.dumps({'version': 1, 'price': '25.00'}),
+                                  content_type='application/json')
+        second = self.client.patch(url, json.dumps({'version': 1, 'name': 'Glaze'}),
+                                   content_type='application/json')
+
+        self.assertEqual((first.status_code, second.status_code), (200, 409))
+        self.assertEqual(Expense.objects.get().name, 'Clay')
@@ -0,0 +1,9 @@
+from django.test import SimpleTestCase
+
+
+class ReadyWaitTests(SimpleTestCase):
+    def test_rejects_non_finite_and_malformed_waits(self):
+        for wait in ['nan', 'inf', '-inf', 'soon']:
+            with self.subTest(wait=wait):
+                response = self.client.get('/api/ready/', {'wait': wait})
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,48 @@
+import json
+
+from django.test import TestCase
+
+from backend import schemas
+from backend.models import Product
+
+VALID_PRODUCT = {'name': 'Mug', 'stock': 5, 'price': '12.50', 'number_sold': 0}
+
+
+class ProductCreateRejectionTests(TestCase):
+    def create(self, **fields):
+        body = json.dumps({**VALID_PRODUCT, **fields})
+        return self.client.post('/api/products/create/', body, content_type='application/json')
+
+    def assertRejected(self, response, field, message):
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], {field: message})
+        self.assertFalse(Product.objects.exists())
+
+    def test_accepts_valid_product(self):
+        self.assertEqual(self.create().status_code, 201)
+
+    def test_rejects_bad_prices(self):
+        for price in ['1e30', '9' * 20, '1.001', 'abc', True]:
+            with self.subTest(price=price):
+                response = self.create(price=price)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('price', response.json()['fields'])
+                self.assertFalse(Product.objects.exists())
+
+    def test_rejects_out_of_range_stock(self):
+        self.assertRejected(self.create(stock=10 ** 30), 'stock', f'Must be at most {schemas.MAX_INTEGER}')
+        self.assertRejected(self.create(stock=-1), 'stock', 'Must be at least 0')
+
+    def test_rejects_malformed_numbers_with_schema_message(self):
+        for stock in ['--5', '5.5', '', '1_000', 1.5]:
+            with self.subTest(stock=stock):
+                self.assertRejected(self.create(stock=stock), 'stock', 'Must be a whole number')
+
+    def test_reports_every_bad_field(self):
+        response = self.create(name='', stock='x', price='1e30')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()['fields']), {'name', 'stock', 'price'})
+
+    def test_rejects_invalid_json(self):
+        response = self.client.post('/api/products/create/', '{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,39 @@
+import json
+import sqlite3
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from backend import streaming
+from backend.models import Product
+
+
+class JsonArrayTests(TransactionTestCase):
+    def setUp(self):
+        Product.objects.bulk_create(
+            Product(name=f'Mug {i}', stock=i, price='5.00', number_sold=0) for i in range(7))
+
+    def test_streams_every_row(self):
+        fields = ['id', 'name']
+        body = b''.join(streaming.json_array(Product.objects.all(), fields, chunk_size=2))
+        self.assertEqual([row['name'] for row in json.loads(body)], [f'Mug {i}' for i in range(7)])
+
+    def test_keeps_requested_order(self):
+        queryset = Product.objects.order_by('-stock')
+        body = b''.join(streaming.json_array(queryset, ['name'], chunk_size=3))
+        self.assertEqual([row['name'] for row in json.loads(body)], [f'Mug {i}' for i in range(6, -1, -1)])
+
+    def test_write_succeeds_while_stream_is_partly_consumed(self):
+        parts = streaming.json_array(Product.objects.all(), ['id', 'name'], chunk_size=2)
+        self.assertEqual(next(parts), b'[')
+        next(parts)
+
+        other = sqlite3.connect(connection.settings_dict['NAME'], uri=True, timeout=0.1)
+        try:
+            other.execute('UPDATE backend_product SET stock = stock + 1')
+            other.commit()
+        finally:
+            other.close()
+
+        rest = b''.join(parts)
+        self.assertTrue(rest.endswith(b']'))
@@ -5,10 +5,16 @@ from .views import (
     TransactionList, TransactionDelete, TransactionCreate, TransactionUpdate,
     GraphData,
     Status,
+    Ready,
+    Events,
+    Profiles,
     ProductComparison,
+    ProductAlerts,
+    Autocomplete,
     SaveData,
     HomeView,
-    ExportData
+    ExportData,
+    ImportData
 )
 
 urlpatterns = [
@@ -41,15 +47,35 @@ urlpatterns = [
     path('transactions/update/<int:pk>/',
          TransactionUpdate.as_view(), name='transaction-update'),
 
+    # Status URLs
+    path('status/', Status.as_view(), name='status'),
+    path('ready/', Ready.as_view(), name='ready'),
+
+    # Live change events
+    path('events/', Events.as_view(), name='event-stream'),
+
+    # Profiling URLs
+    path('debug/profiles/', Profiles.as_view(), name='profile-list'),
+    path('debug/profiles/<str:profile_id>/', Profiles.as_view(), name='profile-detail'),
+
     # Graph URLS
     path('graphdata/', GraphData.as_view(), name='graph-list'),
 
     # Product Comparison URL
     path('products/comparison/', ProductComparison.as_view(), name='product-comparison'),
 
+    # Low Stock Alerts URL
+    path('products/alerts/', ProductAlerts.as_view(), name='product-alerts'),
+
+    # Autocomplete URL
+    path('autocomplete/<str:kind>/', Autocomplete.as_view(), name='autocomplete'),
+
     # Save Data URL
     path('save/', SaveData.as_view(), name='save-data'),
 
     # Export Data URL
-    path('export/', ExportData.as_view(), name='export-data')
+    path('export/', ExportData.as_view(), name='export-data'),
+
+    # Import Data URL
+    path('import/', ImportData.as_view(), name='import-data')
 ]
@@ -0,0 +1,42 @@
+from django.db.models import F
+
+from .models import DataVersion
+from . import stores
+
+
+def current_version():
+    return DataVersion.objects.using(stores.alias()).values_list('version', flat=True).first() or 0
+
+
+def ensure_version_row():
+    """
+    Create the single DataVersion row if it is missing. Migration 0010
+    seeds it; this covers databases restored from before that. Concurrent
+    callers are fine: the insert is INSERT OR IGNORE.
+    """
+    DataVersion.objects.bulk_create([DataVersion(pk=1)], ignore_conflicts=True)
+
+
+def bump_version():
+    """
+    Count a write and return the new version. Call it inside the write's
+    transaction: the version is read back there, before any other writer
+    can move it on.
+    """
+    if not DataVersion.objects.filter(pk=1).update(version=F('version') + 1):
+        ensure_version_row()
+        DataVersion.objects.filter(pk=1).update(version=F('version') + 1)
+    return current_version()
+
+
+def bump_on_write(sender, instance, **kwargs):
+    # Connected to post_save/post_delete of the data models in apps.ready(),
+    # so it runs inside the write's transaction (see LoggedModel). The later
+    # handlers log and publish the version it leaves on the instance.
+    # Bulk operations skip signals and call bump_version() themselves.
+    instance._data_version = bump_version()
+
+
+def written_version(instance):
+    """The data version produced by the write of `instance` being signalled."""
+    return getattr(instance, '_data_version', None) or current_version()
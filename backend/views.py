@@ -1,17 +1,48 @@
-from django.http import JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views import View
-from django.db import connection
-from django.db.models import Q, Sum
-from django.db.models.functions import TruncDate
-from .models import Product, Expense, Transaction
+from django.conf import settings
+from django.db import connection, transaction as db_transaction
+from django.db.models import BigIntegerField, Q, Sum
+from django.db.models.functions import Substr, TruncDate
+from .models import Product, Expense, Transaction, ArchivedExpense, ArchivedTransaction
+from .versioning import current_version
+from . import analytics
+from . import autocomplete
+from . import backups
+from . import archive
+from .routers import analytics_reads
+from . import boot
+from . import changelog
+from . import events
+from . import maintenance
+from .offload import AsyncView, offload
+from . import patching
+from . import profiling
+from . import schemas
+from . import singleflight
+from . import streaming
+from . import stock
+from . import stores
+from .exports import (
+    DOCX_CONTENT_TYPE,
+    bundle_formats, fetch_in_chunks, render_bundle, render_docx, render_pdf, render_txt
+)
+from .importer import DEFAULT_BATCH_SIZE, MAX_REPORTED_ERRORS, import_csv
 from collections import defaultdict
+from itertools import chain
 from datetime import datetime
+import io
 import json
+import math
+import os
+import time
 
 
 def apply_sorting_and_filtering(queryset, request, allowed_sort_fields):
     filters = {key: value for key, value in request.GET.items() if key not in [
-        'sort_by', 'order', 'search', 'show_retired']}
+        'sort_by', 'order', 'search', 'show_retired', 'include_archived', 'since',
+        'stream', 'profile', 'fields', 'distinct']}
 
     # Apply filters from the request
     queryset = queryset.filter(**filters)
@@ -36,7 +67,79 @@ def apply_sorting_and_filtering(queryset, request, allowed_sort_fields):
     return queryset
 
 
-class GraphData(View):
+def include_archived(request):
+    return request.GET.get('include_archived', 'false').lower() == 'true'
+
+
+def requested_fields(request, allowed_fields, require_id=False):
+    """Validated columns from `fields=a,b`, or every allowed column when absent."""
+    fields = request.GET.get('fields')
+    if not fields:
+        return allowed_fields
+    fields = [f.strip() for f in fields.split(',') if f.strip()]
+    invalid = [f for f in fields if f not in allowed_fields]
+    if invalid or not fields:
+        raise ValueError(f'Invalid fields: {", ".join(invalid)}. Allowed: {", ".join(allowed_fields)}')
+    if require_id and 'id' not in fields:
+        # Delta syncs work out tombstones from the ids.
+        fields = ['id'] + fields
+    return fields
+
+
+def distinct_requested(request):
+    return request.GET.get('distinct', 'false').lower() == 'true'
+
+
+def project(queryset, fields, distinct=False):
+    queryset = queryset.values(*fields)
+    return queryset.distinct() if distinct else queryset
+
+
+def stream_requested(request):
+    return request.GET.get('stream', 'false').lower() == 'true'
+
+
+def sync_since(request):
+    """The `since` data version of a delta sync request, or None for a full listing."""
+    since = request.GET.get('since')
+    if since is None:
+        return None
+    if not since.isdigit():
+        raise ValueError(f'Invalid since version: {since}')
+    return int(since)
+
+
+def schema_error_response(error):
+    return JsonResponse({'error': str(error), 'fields': error.errors}, status=error.status)
+
+
+def conflict_response(conflict, serialize=patching.row):
+    return JsonResponse({'error': f'Version conflict: {conflict}', 'current': serialize(conflict.current)},
+                        status=409)
+
+
+def delta_response(since, model, changed_queryset, full_queryset, serialize):
+    """
+    Rows of `model` changed after version `since` plus tombstones for those
+    that were deleted (or no longer match the request's filters). Falls back
+    to every row of `full_queryset` when the change log can't answer.
+    """
+    # One read transaction, so the version matches the rows returned.
+    with db_transaction.atomic(using=stores.alias()):
+        version = current_version()
+        changed = changelog.changed_ids(model, since)
+        if changed is None:
+            return JsonResponse({
+                'version': version, 'full': True, 'changed': serialize(full_queryset), 'deleted': []
+            })
+        rows = serialize(changed_queryset.filter(id__in=changed))
+    present = {row['id'] for row in rows}
+    return JsonResponse({
+        'version': version, 'full': False, 'changed': rows, 'deleted': sorted(changed - present)
+    })
+
+
+class GraphData(AsyncView):
 
     def _get_money_data(self, timescale):
         today = datetime.now()
@@ -58,39 +161,43 @@ class GraphData(View):
                     {'error': 'Invalid time scale'},
                     status=400)
 
-        # Fetch data from Expense model and group by date
-        expenses_query = (
-            Expense.objects
-            .filter(date__gte=start_date)
-            .annotate(date=TruncDate('date'))
-            .values('date')
-            .annotate(total_expense=Sum('price'))
-            .values('date', 'total_expense')
-        )
-
-        expenses = list(expenses_query)
+        # Fetch data from Expense model (and its archive, when the range
+        # reaches it) and group by date
+        expenses = []
+        for expenses_source in archive.sources(Expense, start_date):
+            expenses += (
+                expenses_source
+                .filter(date__gte=start_date)
+                .annotate(date=TruncDate('date'))
+                .values('date')
+                .annotate(total_expense=Sum('price'))
+                .values('date', 'total_expense')
+            )
 
         # Fetch data from Transaction model and group by date
-        transactions_query = (
-            Transaction.objects
-            .filter(date__gte=start_date)
-            .annotate(date=TruncDate('date'))
-            .values('date')
-            .annotate(total_income=Sum('total'))
-            .values('date', 'total_income')
-        )
-
-        transactions = list(transactions_query)
+        transactions = []
+        for transactions_source in archive.sources(Transaction, start_date):
+            transactions += (
+                transactions_source
+                .filter(date__gte=start_date)
+                .annotate(date=TruncDate('date'))
+                .values('date')
+                .annotate(total_income=Sum('total'))
+                .values('date', 'total_income')
+            )
 
-        # Aggregate daily data into dictionaries
-        daily_expenses = defaultdict(float)
-        daily_income = defaultdict(float)
+        # Aggregate daily data into dictionaries; a day can have rows in
+        # both the hot and the archive table
+        daily_expenses = {}
+        daily_income = {}
 
         for expense in expenses:
-            daily_expenses[expense['date']] = expense['total_expense']
+            daily_expenses[expense['date']] = daily_expenses.get(
+                expense['date'], 0) + expense['total_expense']
 
         for transaction in transactions:
-            daily_income[transaction['date']] = transaction['total_income']
+            daily_income[transaction['date']] = daily_income.get(
+                transaction['date'], 0) + transaction['total_income']
 
         # Prepare data for chart
         dates = sorted(
@@ -127,6 +234,18 @@ class GraphData(View):
     def _get_product_data(self, timescale):
         return
 
+    def _monthly_cents(self, model, field, year_start, year_end):
+        # Summed per month in SQL, in exact integer cents.
+        cents = defaultdict(int)
+        for source in archive.sources(model, year_start):
+            rows = (source.filter(date__range=(year_start, year_end))
+                    .annotate(month=Substr('date', 6, 2)).values('month')
+                    .annotate(amount=Sum(field, output_field=BigIntegerField()))
+                    .values_list('month', 'amount'))
+            for month, amount in rows:
+                cents[int(month)] += amount
+        return cents
+
     def _get_timeseries_data(self, request_data):
         try:
             years_str = request_data.get('years', str(datetime.now().year))
@@ -152,24 +271,13 @@ class GraphData(View):
 
                 month_labels = [f'{year}-{str(m).zfill(2)}' for m in range(1, 13)]
 
-                revenue_by_month = defaultdict(float)
-                loss_by_month = defaultdict(float)
-
-                transactions = Transaction.objects.filter(date__range=(year_start, year_end))
-                expenses = Expense.objects.filter(date__range=(year_start, year_end))
-
-                for transaction in transactions:
-                    month = transaction.date.month
-                    revenue_by_month[month] += float(transaction.total)
-
-                for expense in expenses:
-                    month = expense.date.month
-                    loss_by_month[month] += float(expense.price)
+                revenue_by_month = self._monthly_cents(Transaction, 'total', year_start, year_end)
+                loss_by_month = self._monthly_cents(Expense, 'price', year_start, year_end)
 
                 if 'revenue' in metrics:
                     all_datasets.append({
                         'label': f'Revenue {year}',
-                        'data': [revenue_by_month[m] for m in range(1, 13)],
+                        'data': [revenue_by_month[m] / 100 for m in range(1, 13)],
                         'borderColor': year_colors[year],
                         'backgroundColor': 'transparent',
                         'borderWidth': 2,
@@ -180,7 +288,7 @@ class GraphData(View):
                 if 'loss' in metrics:
                     all_datasets.append({
                         'label': f'Loss {year}',
-                        'data': [loss_by_month[m] for m in range(1, 13)],
+                        'data': [loss_by_month[m] / 100 for m in range(1, 13)],
                         'borderColor': year_colors[year],
                         'backgroundColor': 'transparent',
                         'borderWidth': 2,
@@ -191,7 +299,7 @@ class GraphData(View):
                 if 'profit' in metrics:
                     all_datasets.append({
                         'label': f'Profit {year}',
-                        'data': [revenue_by_month[m] - loss_by_month[m] for m in range(1, 13)],
+                        'data': [(revenue_by_month[m] - loss_by_month[m]) / 100 for m in range(1, 13)],
                         'borderColor': year_colors[year],
                         'backgroundColor': 'transparent',
                         'borderWidth': 2,
@@ -215,7 +323,9 @@ class GraphData(View):
                     for product in selected_products:
                         product_sales[product] = defaultdict(int)
 
-                    transactions = Transaction.objects.filter(date__range=(year_start, year_end))
+                    transactions = chain.from_iterable(
+                        source.filter(date__range=(year_start, year_end))
+                        for source in archive.sources(Transaction, year_start))
 
                     for transaction in transactions:
                         if isinstance(transaction.products, str):
@@ -260,21 +370,45 @@ class GraphData(View):
                 'datasets': []
             }
 
-    def post(self, request):
+    async def post(self, request):
+        return await offload(self._post, request)
+
+    def _graph(self, data):
+        if data['graph'] == 'money':
+            return self._get_money_data(data['timescale'])
+        elif data['graph'] == 'product':
+            return self._get_product_data(data['timescale'])
+        elif data['graph'] == 'timeseries':
+            return self._get_timeseries_data(data)
+        elif data['graph'] in analytics.GRAPHS:
+            return analytics.GRAPHS[data['graph']](data)
+        raise KeyError
+
+    def _render(self, data, out):
+        with analytics_reads():
+            if stores.fanning_out() and data['graph'] not in analytics.GRAPHS:
+                # The analytics graphs merge their own per-store arrays.
+                res = stores.merge_charts(stores.fan_out(self._graph, data),
+                                          sort_labels=data['graph'] == 'money')
+            else:
+                res = self._graph(data)
+        out.write(json.dumps(res, cls=DjangoJSONEncoder).encode())
+        return {}
+
+    def _post(self, request):
         try:
             data = json.loads(request.body)
-            if data['graph'] == 'money':
-                res = self._get_money_data(data['timescale'])
-            elif data['graph'] == 'product':
-                res = self._get_product_data(data['timescale'])
-            elif data['graph'] == 'timeseries':
-                res = self._get_timeseries_data(data)
-            else:
-                res = None
-                raise KeyError
-            return JsonResponse(res, safe=False)
+            if not isinstance(data, dict) or not isinstance(data.get('graph'), str):
+                return JsonResponse({'error': 'graph must be given as a string'}, status=400)
+            # Concurrent identical graph requests share one computation
+            result = singleflight.coalesce(
+                'graph', data, lambda out: self._render(data, out))
+            with open(result['path'], 'rb') as f:
+                return HttpResponse(f.read(), content_type='application/json')
         except KeyError as e:
             return JsonResponse({'error': f'Graph requested `{data["graph"]}` is not available: {e}'}, status=404)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
@@ -283,11 +417,81 @@ class Status(View):
     def get(self, request):
         try:
             connection.ensure_connection()
-            return JsonResponse({"status": "ok"}, status=200)
+            return JsonResponse({
+                "status": "ok",
+                "coalescing": {"pid": os.getpid(), **singleflight.metrics},
+                "backups": backups.status(),
+                "maintenance": maintenance.status(),
+            }, status=200)
         except Exception:
             return JsonResponse({"status": "error"}, status=500)
 
 
+class Ready(View):
+    # Launchers can pass ?wait=<seconds> to block here until the backend is
+    # ready instead of polling on a timer.
+    MAX_WAIT = 60
+
+    def _is_ready(self):
+        try:
+            connection.ensure_connection()
+            return boot.migrations_current()
+        except Exception:
+            return False
+
+    def get(self, request):
+        try:
+            wait = float(request.GET.get('wait', 0))
+        except ValueError:
+            wait = math.nan
+        if not math.isfinite(wait):
+            return JsonResponse({'error': 'Invalid wait'}, status=400)
+        wait = min(max(wait, 0), self.MAX_WAIT)
+
+        deadline = time.monotonic() + wait
+        while not self._is_ready():
+            if time.monotonic() >= deadline:
+                return JsonResponse({"status": "starting"}, status=503)
+            time.sleep(0.25)
+        return JsonResponse({"status": "ready", "boot": boot.timings}, status=200)
+
+
+class Profiles(View):
+    def get(self, request, profile_id=None):
+        if not settings.PROFILING_ENABLED:
+            return JsonResponse({'error': 'Profiling is disabled'}, status=404)
+        try:
+            if profile_id is None:
+                return JsonResponse(profiling.list_profiles(), safe=False)
+            top = int(request.GET.get('top', 25))
+            sort = request.GET.get('sort', 'cumulative')
+            if sort not in ('cumulative', 'tottime', 'calls'):
+                return JsonResponse({'error': f'Invalid sort: {sort}'}, status=400)
+            return JsonResponse({
+                'id': profile_id,
+                'functions': profiling.top_functions(profile_id, top, sort)
+            })
+        except FileNotFoundError:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        except ValueError:
+            return JsonResponse({'error': 'top must be a number'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
+
+
+class Events(View):
+    # Under ASGI this URL is answered by events.asgi_stream instead (see
+    # asgi.py); this view serves it from the development and WSGI servers,
+    # holding one thread per open stream.
+    def get(self, request):
+        response = StreamingHttpResponse(
+            events.stream(stores.current(), request.headers.get('Last-Event-ID')),
+            content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
 class ProductList(View):
     def get(self, request):
         try:
@@ -301,9 +505,19 @@ class ProductList(View):
             allowed_sort_fields = ['name', 'price', 'stock', 'number_sold']
             products = apply_sorting_and_filtering(
                 products, request, allowed_sort_fields)
+            since = sync_since(request)
+            fields = requested_fields(request, streaming.model_fields(Product), since is not None)
+            products = project(products, fields, distinct_requested(request))
+
+            if since is not None:
+                return delta_response(since, Product, products, products, list)
+            if stream_requested(request):
+                return streaming.json_array_response(products, fields)
 
-            products = list(products.values())
+            products = list(products)
             return JsonResponse(products, safe=False)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
 
@@ -323,18 +537,17 @@ class ProductDelete(View):
 class ProductCreate(View):
     def post(self, request):
         try:
-            data = json.loads(request.body)
-            valid_products = Product.objects.values_list('name', flat=True)
-            if data['name'].lower() in [p.lower() for p in valid_products]:
-                return JsonResponse({'error': f'Product already exists: {data["name"]}'}, status=400)
-            if data['name'].lower() == 'unknown':
-                return JsonResponse({'error': 'Cannot create Unknown Product'}, status=400)
+            data = schemas.PRODUCT_CREATE.parse(request)
+            error = product_name_error(data.name)
+            if error:
+                return JsonResponse({'error': error}, status=400)
 
             product = Product.objects.create(
-                name=data['name'],
-                stock=data['stock'],
-                price=data['price'],
-                number_sold=data['number_sold']
+                name=data.name,
+                stock=data.stock,
+                price=data.price,
+                number_sold=data.number_sold,
+                is_retired=data.is_retired
             )
             return JsonResponse({
                 'id': product.id,
@@ -343,29 +556,35 @@ class ProductCreate(View):
                 'price': product.price,
                 'number_sold': product.number_sold
             }, status=201)
-        except KeyError as e:
-            return JsonResponse({'error': f'Missing field: {str(e)}'}, status=400)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
 
+def product_name_error(name, pk=None):
+    """Why a product (other than `pk`) can't be named `name`, or None."""
+    if name.lower() == 'unknown':
+        return 'Cannot create Unknown Product'
+    valid_products = Product.objects.exclude(pk=pk).values_list('name', flat=True)
+    if name.lower() in [p.lower() for p in valid_products]:
+        return f'Product already exists: {name}'
+    return None
+
+
 class ProductUpdate(View):
     def put(self, request, pk):
         try:
-            data = json.loads(request.body)
+            data = schemas.PRODUCT_UPDATE.parse(request)
+            error = data.name and product_name_error(data.name, pk)
+            if error:
+                return JsonResponse({'error': error}, status=400)
             product = Product.objects.get(pk=pk)
-            valid_products = Product.objects.values_list('name', flat=True)
-
-            if data['name'].lower() in [p.lower() for p in valid_products] and data['name'].lower() != product.name.lower():
-                return JsonResponse({'error': f'Product already exists: {data["name"]}'}, status=400)
-            if data['name'].lower() == 'unknown':
-                return JsonResponse({'error': 'Cannot create Unknown Product'}, status=400)
 
-            for field in ['name', 'stock', 'price', 'number_sold', 'is_retired']:
-                if field in data:
-                    setattr(product, field, data[field])
+            for field, value in schemas.provided(data).items():
+                setattr(product, field, value)
 
             product.save()
             return JsonResponse({
@@ -377,8 +596,29 @@ class ProductUpdate(View):
             }, status=205)
         except Product.DoesNotExist:
             return JsonResponse({'error': 'Not found'}, status=404)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
+
+    def patch(self, request, pk):
+        try:
+            fields = schemas.provided(schemas.PRODUCT_PATCH.parse(request))
+            version = fields.pop('version')
+            error = 'name' in fields and product_name_error(fields['name'], pk)
+            if error:
+                return JsonResponse({'error': error}, status=400)
+
+            product = patching.apply(Product, pk, version, fields)
+            return JsonResponse(patching.row(product))
+        except Product.DoesNotExist:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        except patching.Conflict as e:
+            return conflict_response(e)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
@@ -390,8 +630,28 @@ class ExpenseList(View):
             allowed_sort_fields = ['name', 'date', 'price', 'type']
             expenses = apply_sorting_and_filtering(
                 expenses, request, allowed_sort_fields)
-            expenses = list(expenses.values())
+            since = sync_since(request)
+            fields = requested_fields(request, streaming.model_fields(Expense), since is not None)
+            distinct = distinct_requested(request)
+            expenses = project(expenses, fields, distinct)
+            listed = expenses
+            if include_archived(request):
+                archived = apply_sorting_and_filtering(
+                    ArchivedExpense.objects.all(), request, allowed_sort_fields)
+                # UNION (rather than UNION ALL) also removes duplicates across the two.
+                listed = archive.union_with_archive(
+                    expenses, project(archived, fields, distinct), all=not distinct)
+
+            if since is not None:
+                # Archived rows only change in bulk, which forces a full sync.
+                return delta_response(since, Expense, expenses, listed, list)
+            if stream_requested(request):
+                return streaming.json_array_response(listed, fields)
+
+            expenses = list(listed)
             return JsonResponse(expenses, safe=False)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
@@ -411,12 +671,12 @@ class ExpenseDelete(View):
 class ExpenseCreate(View):
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = schemas.EXPENSE_CREATE.parse(request)
             expense = Expense.objects.create(
-                name=data['name'],
-                date=data['date'],
-                type=data['type'],
-                price=data['price']
+                name=data.name,
+                date=data.date,
+                type=data.type,
+                price=data.price
             )
             return JsonResponse({
                 'id': expense.id,
@@ -425,10 +685,10 @@ class ExpenseCreate(View):
                 'type': expense.type,
                 'price': expense.price
             }, status=201)
-        except KeyError as e:
-            return JsonResponse({'error': f'Missing field: {str(e)}'}, status=400)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
@@ -436,12 +696,11 @@ class ExpenseCreate(View):
 class ExpenseUpdate(View):
     def put(self, request, pk):
         try:
-            data = json.loads(request.body)
+            data = schemas.EXPENSE_UPDATE.parse(request)
             expense = Expense.objects.get(pk=pk)
 
-            for field in ['name', 'date', 'type', 'price']:
-                if field in data:
-                    setattr(expense, field, data[field])
+            for field, value in schemas.provided(data).items():
+                setattr(expense, field, value)
 
             expense.save()
             return JsonResponse({
@@ -452,11 +711,60 @@ class ExpenseUpdate(View):
             }, status=205)
         except Expense.DoesNotExist:
             return JsonResponse({'error': 'Not found'}, status=404)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
+    def patch(self, request, pk):
+        try:
+            fields = schemas.provided(schemas.EXPENSE_PATCH.parse(request))
+            version = fields.pop('version')
+            expense = patching.apply(Expense, pk, version, fields)
+            return JsonResponse(patching.row(expense))
+        except Expense.DoesNotExist:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        except patching.Conflict as e:
+            return conflict_response(e)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
+
+
+def missing_product(names):
+    """The first of `names` that is not a product (or 'unknown'), or None."""
+    if not names:
+        return None
+    valid_products = {p.lower().strip() for p in Product.objects.values_list('name', flat=True)}
+    valid_products.add('unknown')
+    return next((name for name in names if name.lower() not in valid_products), None)
+
+
+def trim_products(products):
+    # trims the '' and [] off of the stored list string
+    return products.replace("'", "")[1:-1]
+
+
+def serialize_transaction(transaction):
+    # if this is a string, we do not want to use the comma join
+    # or else it will list-ify the string, and list its chars
+    if isinstance(transaction.products, str):
+        products = transaction.products
+    else:
+        products = ', '.join(transaction.products)
+    products = trim_products(products)
+    return {
+        'id': transaction.id,
+        'total': transaction.total,
+        'date': transaction.date,
+        'type': transaction.type,
+        'products': products,
+        'version': transaction.version
+    }
+
 
 class TransactionList(View):
     def get(self, request):
@@ -465,29 +773,31 @@ class TransactionList(View):
             allowed_sort_fields = ['date', 'total', 'type']
             transactions = apply_sorting_and_filtering(
                 transactions, request, allowed_sort_fields)
-
-            transaction_data = []
-            for transaction in transactions:
-                # if this is a string, we do not want to use the comma join
-                # or else it will list-ify the string, and list its chars
-                if isinstance(transaction.products, str):
-                    products = transaction.products
-                else:
-                    products = ', '.join(transaction.products)
-                # trims the '' and [] off of the string
-                products = products.replace("'", "")[1:-1]
-                transaction_data.append({
-                    'id': transaction.id,
-                    'total': transaction.total,
-                    'date': transaction.date,
-                    'type': transaction.type,
-                    'products': products
-                })
-
-            return JsonResponse(transaction_data, safe=False)
+            listed = transactions
+            if include_archived(request):
+                archived = apply_sorting_and_filtering(
+                    ArchivedTransaction.objects.all(), request, allowed_sort_fields)
+                listed = archive.union_with_archive(transactions, archived)
+
+            since = sync_since(request)
+            if since is not None:
+                # Archived rows only change in bulk, which forces a full sync.
+                return delta_response(
+                    since, Transaction, transactions, listed, self._serialize)
+            if stream_requested(request):
+                return streaming.json_array_response(
+                    listed, ['id', 'total', 'date', 'type', 'products', 'version'],
+                    {'products': trim_products})
+
+            return JsonResponse(self._serialize(listed), safe=False)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
+    def _serialize(self, transactions):
+        return [serialize_transaction(transaction) for transaction in transactions]
+
 
 class TransactionDelete(View):
     def delete(self, request, pk):
@@ -504,28 +814,20 @@ class TransactionDelete(View):
 class TransactionCreate(View):
     def post(self, request):
         try:
-            data = json.loads(request.body)
+            data = schemas.TRANSACTION_CREATE.parse(request)
 
-            product_names_list = data.get('products', [])
-            if isinstance(product_names_list, str):
-                product_names_list = [p.strip()
-                                      for p in product_names_list.split(',')]
-            valid_products = Product.objects.values_list('name', flat=True)
-            print(valid_products)
-            for product in product_names_list:
-                if product.lower() not in [p.lower().strip() for p in valid_products] and product.lower() != 'unknown':
-                    print(f'Product does not exist: {product}')
-                    return JsonResponse({'error': f'Product does not exist: {product}'}, status=400)
+            product_names_list = data.products
+            missing = missing_product(product_names_list)
+            if missing is not None:
+                return JsonResponse({'error': f'Product does not exist: {missing}'}, status=400)
 
             transaction = Transaction.objects.create(
-                total=data['total'],
-                date=data['date'],
-                type=data['type']
+                total=data.total,
+                date=data.date,
+                type=data.type,
+                products=product_names_list
             )
 
-            transaction.products = product_names_list
-            transaction.save()
-
             return JsonResponse({
                 'id': transaction.id,
                 'total': transaction.total,
@@ -534,10 +836,10 @@ class TransactionCreate(View):
                 'products': product_names_list
             }, status=201)
 
-        except KeyError as e:
-            return JsonResponse({'error': f'Missing field: {str(e)}'}, status=400)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
 
@@ -545,25 +847,20 @@ class TransactionCreate(View):
 class TransactionUpdate(View):
     def put(self, request, pk):
         try:
-            data = json.loads(request.body)
+            data = schemas.TRANSACTION_UPDATE.parse(request)
             transaction = Transaction.objects.get(pk=pk)
 
-            for field in ['total', 'date', 'type']:
-                if field in data:
-                    setattr(transaction, field, data[field])
-
-            product_names_list = data.get('products', [])
-            if isinstance(product_names_list, str):
-                product_names_list = [p.strip()
-                                      for p in product_names_list.split(',')]
-
-            valid_products = Product.objects.values_list('name', flat=True)
-
-            for product in product_names_list:
-                if product.lower() not in [p.lower().strip() for p in valid_products] and product.lower() != 'unknown':
-                    return JsonResponse({'error': f'Product does not exist: {product}'}, status=400)
+            product_names_list = data.products
+            if product_names_list is schemas.UNSET:
+                # Left out of the request: keep the stored products.
+                product_names_list = [p.strip() for p in trim_products(transaction.products).split(',') if p.strip()]
+            else:
+                missing = missing_product(product_names_list)
+                if missing is not None:
+                    return JsonResponse({'error': f'Product does not exist: {missing}'}, status=400)
 
-            transaction.products = product_names_list
+            for field, value in schemas.provided(data).items():
+                setattr(transaction, field, value)
             transaction.save()
 
             return JsonResponse({
@@ -576,8 +873,29 @@ class TransactionUpdate(View):
 
         except Transaction.DoesNotExist:
             return JsonResponse({'error': 'Not found'}, status=404)
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
+
+    def patch(self, request, pk):
+        try:
+            fields = schemas.provided(schemas.TRANSACTION_PATCH.parse(request))
+            version = fields.pop('version')
+            missing = missing_product(fields.get('products'))
+            if missing is not None:
+                return JsonResponse({'error': f'Product does not exist: {missing}'}, status=400)
+
+            transaction = patching.apply(Transaction, pk, version, fields)
+            return JsonResponse(serialize_transaction(transaction))
+        except Transaction.DoesNotExist:
+            return JsonResponse({'error': 'Not found'}, status=404)
+        except patching.Conflict as e:
+            return conflict_response(e, serialize_transaction)
+        except schemas.SchemaError as e:
+            return schema_error_response(e)
         except Exception as e:
             return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
 
@@ -585,7 +903,8 @@ class TransactionUpdate(View):
 class ProductComparison(View):
     def get(self, request):
         try:
-            products = Product.objects.filter(is_retired=False)
+            with analytics_reads():
+                products = list(Product.objects.filter(is_retired=False))
 
             product_details = []
             stock_data = []
@@ -623,19 +942,51 @@ class ProductComparison(View):
             return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
 
 
-class SaveData(View):
-    def post(self, request):
+class Autocomplete(View):
+    def get(self, request, kind):
         try:
-            # Force database commit (Django handles this automatically, but we'll provide feedback)
-            from django.db import transaction
-            transaction.commit()
+            limit = int(request.GET.get('limit', autocomplete.DEFAULT_LIMIT))
+            return JsonResponse(autocomplete.suggest(kind, request.GET.get('q', ''), limit), safe=False)
+        except KeyError:
+            return JsonResponse({'error': f'No suggestions for `{kind}`'}, status=404)
+        except ValueError:
+            return JsonResponse({'error': 'limit must be a number'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
+
 
-            # Return success with current timestamp
-            import datetime
+class ProductAlerts(View):
+    def get(self, request):
+        try:
+            alerts = [{
+                'id': v.product.id,
+                'name': v.product.name,
+                'stock': v.product.stock,
+                'sold_30d': v.sold_30d,
+                'sold_90d': v.sold_90d,
+                'units_per_day': round(v.units_per_day, 2),
+                'reorder_point': v.reorder_point,
+                'days_of_cover': round(v.days_of_cover, 1)
+            } for v in stock.low_stock()]
+            return JsonResponse(alerts, safe=False)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error: {e}'}, status=500)
+
+
+class SaveData(AsyncView):
+    async def post(self, request):
+        return await offload(self._post, request)
+
+    def _post(self, request):
+        try:
+            # Every write is already committed; take an online backup. An
+            # unchanged database reuses its latest backup.
+            manifest = backups.backup(force=request.GET.get('force', 'false').lower() == 'true')
             return JsonResponse({
                 "message": "Data saved successfully",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "status": "saved"
+                "timestamp": datetime.now().isoformat(),
+                "status": "saved",
+                "backup": manifest,
             }, status=200)
         except Exception as e:
             return JsonResponse({
@@ -667,281 +1018,100 @@ class HomeView(View):
             return HttpResponseServerError(f'Error serving frontend: {str(e)}')
 
 
-class ExportData(View):
-    def get(self, request):
+class ExportData(AsyncView):
+    async def get(self, request):
+        return await offload(self._get, request)
+
+    def _get(self, request):
         try:
             data_type = request.GET.get('type', 'all')
             format_type = request.GET.get('format', 'txt')
+            formats = None
+            if format_type == 'bundle':
+                formats = bundle_formats(request.GET.get('formats'))
+            elif format_type not in ['pdf', 'docx']:
+                format_type = 'txt'
 
-            data = {}
-            title = ''
+            # Generate filename with timestamp
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f'amanda_lynn_{data_type}_{timestamp}'
 
-            if data_type in ['products', 'all']:
-                products = list(Product.objects.all().values())
-                data['products'] = products
-                title = 'Products'
+            # Concurrent identical exports share one rendered file
+            result = singleflight.coalesce(
+                'export', {'type': data_type, 'format': format_type, 'formats': formats},
+                lambda out: self._render(data_type, format_type, filename, out, formats))
 
-            if data_type in ['expenses', 'all']:
-                expenses = list(Expense.objects.all().values())
-                data['expenses'] = expenses
-                title = 'Expenses'
+            response = FileResponse(open(result['path'], 'rb'), content_type=result['content_type'])
+            response['Content-Length'] = os.path.getsize(result['path'])
+            response['Content-Disposition'] = f'attachment; filename="{result["filename"]}"'
+            return response
 
-            if data_type in ['transactions', 'all']:
-                transactions = list(Transaction.objects.all().values())
-                data['transactions'] = transactions
-                title = 'Transactions'
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Export failed: {str(e)}'}, status=500)
 
-            # Generate filename with timestamp
-            from datetime import datetime
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f'amanda_lynn_{data_type}_{timestamp}'
+    def _render(self, data_type, format_type, filename, out, formats=None):
+        data = {}
 
+        if data_type in ['products', 'all']:
+            data['products'] = Product.objects.all().values()
+
+        if data_type in ['expenses', 'all']:
+            data['expenses'] = Expense.objects.all().values()
+
+        if data_type in ['transactions', 'all']:
+            data['transactions'] = Transaction.objects.all().values()
+
+        with analytics_reads():
+            if stores.fanning_out():
+                data = {key: stores.gather(queryset) for key, queryset in data.items()}
+            if format_type == 'bundle':
+                # Queried once here; every worker process renders from the same rows.
+                data = {key: list(rows) for key, rows in data.items()}
+                render_bundle(data, data_type, formats, filename, out, settings.EXPORT_WORKERS)
+                return {'content_type': 'application/zip', 'filename': f'{filename}.zip'}
             if format_type == 'pdf':
-                return self._generate_pdf(data, filename, data_type)
+                self._generate_pdf(data, data_type, out)
+                return {'content_type': 'application/pdf', 'filename': f'{filename}.pdf'}
             elif format_type == 'docx':
-                return self._generate_docx(data, filename, data_type)
+                self._generate_docx(data, data_type, out)
+                return {'content_type': DOCX_CONTENT_TYPE, 'filename': f'{filename}.docx'}
             else:
-                return self._generate_txt(data, filename, data_type)
+                self._generate_txt(data, data_type, out)
+                return {'content_type': 'text/plain', 'filename': f'{filename}.txt'}
 
-        except Exception as e:
-            return JsonResponse({'error': f'Export failed: {str(e)}'}, status=500)
+    def _generate_txt(self, data, data_type, out):
+        render_txt(data, data_type, out)
 
-    def _generate_txt(self, data, filename, data_type):
-        from datetime import datetime
-        content = []
-        content.append('=' * 60)
-        content.append('AMANDA LYNN DATA EXPORT')
-        content.append(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-        content.append(f'Data Type: {data_type.upper()}')
-        content.append('=' * 60)
-        content.append('')
-
-        if 'products' in data and data['products']:
-            content.append('-' * 40)
-            content.append('PRODUCTS')
-            content.append('-' * 40)
-            for i, p in enumerate(data['products'], 1):
-                content.append(f'{i}. {p.get("name", "N/A")}')
-                content.append(f'   Stock: {p.get("stock", 0)}')
-                content.append(f'   Price: ${p.get("price", 0)}')
-                content.append(f'   Sold: {p.get("number_sold", 0)}')
-                content.append(f'   Status: {"Active" if not p.get("is_retired") else "Retired"}')
-                content.append('')
-
-        if 'expenses' in data and data['expenses']:
-            content.append('')
-            content.append('-' * 40)
-            content.append('EXPENSES')
-            content.append('-' * 40)
-            for i, e in enumerate(data['expenses'], 1):
-                content.append(f'{i}. {e.get("name", "N/A")}')
-                content.append(f'   Date: {e.get("date", "N/A")}')
-                content.append(f'   Type: {e.get("type", "N/A")}')
-                content.append(f'   Amount: ${e.get("price", 0)}')
-                content.append('')
-
-        if 'transactions' in data and data['transactions']:
-            content.append('')
-            content.append('-' * 40)
-            content.append('TRANSACTIONS')
-            content.append('-' * 40)
-            for i, t in enumerate(data['transactions'], 1):
-                content.append(f'{i}. Transaction #{t.get("id", "N/A")}')
-                content.append(f'   Date: {t.get("date", "N/A")}')
-                content.append(f'   Type: {t.get("type", "N/A")}')
-                content.append(f'   Total: ${t.get("total", 0)}')
-                content.append(f'   Products: {t.get("products", "N/A")}')
-                content.append('')
-
-        content.append('')
-        content.append('=' * 60)
-        content.append('END OF EXPORT')
-        content.append('=' * 60)
-
-        from django.http import HttpResponse
-        response = HttpResponse('\n'.join(content), content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.txt"'
-        return response
+    def _generate_pdf(self, data, data_type, out):
+        # Rows are read a chunk at a time as the PDF is laid out, with no
+        # cursor left open in between (see fetch_in_chunks).
+        # (Rows merged from several stores are already lists.)
+        rows = {key: iter(rows) if isinstance(rows, list) else fetch_in_chunks(rows)
+                for key, rows in data.items()}
+        render_pdf(rows, data_type, out)
 
-    def _generate_pdf(self, data, filename, data_type):
-        from reportlab.lib.pagesizes import letter
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        from reportlab.lib import colors
-        from io import BytesIO
-        from datetime import datetime
-
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        # Title
-        title_style = styles['Title']
-        elements.append(Paragraph('AMANDA LYNN DATA EXPORT', title_style))
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', styles['Normal']))
-        elements.append(Paragraph(f'Data Type: {data_type.upper()}', styles['Normal']))
-        elements.append(Spacer(1, 20))
-
-        if 'products' in data and data['products']:
-            elements.append(Paragraph('PRODUCTS', styles['Heading2']))
-            product_data = [['Name', 'Stock', 'Price', 'Sold', 'Status']]
-            for p in data['products']:
-                product_data.append([
-                    p.get('name', 'N/A'),
-                    str(p.get('stock', 0)),
-                    f'${p.get("price", 0)}',
-                    str(p.get('number_sold', 0)),
-                    'Active' if not p.get('is_retired') else 'Retired'
-                ])
-            t = Table(product_data)
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            elements.append(t)
-            elements.append(Spacer(1, 20))
-
-        if 'expenses' in data and data['expenses']:
-            elements.append(Paragraph('EXPENSES', styles['Heading2']))
-            expense_data = [['Name', 'Date', 'Type', 'Amount']]
-            for e in data['expenses']:
-                expense_data.append([
-                    e.get('name', 'N/A'),
-                    str(e.get('date', 'N/A')),
-                    e.get('type', 'N/A'),
-                    f'${e.get("price", 0)}'
-                ])
-            t = Table(expense_data)
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            elements.append(t)
-            elements.append(Spacer(1, 20))
-
-        if 'transactions' in data and data['transactions']:
-            elements.append(Paragraph('TRANSACTIONS', styles['Heading2']))
-            trans_data = [['ID', 'Date', 'Type', 'Total', 'Products']]
-            for t in data['transactions']:
-                trans_data.append([
-                    str(t.get('id', 'N/A')),
-                    str(t.get('date', 'N/A')),
-                    t.get('type', 'N/A'),
-                    f'${t.get("total", 0)}',
-                    t.get('products', 'N/A')[:30] + '...' if len(str(t.get('products', ''))) > 30 else t.get('products', 'N/A')
-                ])
-            t = Table(trans_data)
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ]))
-            elements.append(t)
-
-        doc.build(elements)
-
-        from django.http import HttpResponse
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.pdf"'
-        return response
+    def _generate_docx(self, data, data_type, out):
+        render_docx(data, data_type, out)
 
-    def _generate_docx(self, data, filename, data_type):
-        from docx import Document
-        from docx.shared import Inches, Pt
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-
-        doc = Document()
-
-        # Title
-        title = doc.add_heading('AMANDA LYNN DATA EXPORT', 0)
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-
-        doc.add_paragraph(f'Export Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-        doc.add_paragraph(f'Data Type: {data_type.upper()}')
-        doc.add_paragraph('')
-
-        if 'products' in data and data['products']:
-            doc.add_heading('PRODUCTS', level=1)
-            table = doc.add_table(rows=1, cols=5)
-            table.style = 'Table Grid'
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = 'Name'
-            hdr_cells[1].text = 'Stock'
-            hdr_cells[2].text = 'Price'
-            hdr_cells[3].text = 'Sold'
-            hdr_cells[4].text = 'Status'
-
-            for p in data['products']:
-                row_cells = table.add_row().cells
-                row_cells[0].text = p.get('name', 'N/A')
-                row_cells[1].text = str(p.get('stock', 0))
-                row_cells[2].text = f'${p.get("price", 0)}'
-                row_cells[3].text = str(p.get('number_sold', 0))
-                row_cells[4].text = 'Active' if not p.get('is_retired') else 'Retired'
-
-            doc.add_paragraph('')
-
-        if 'expenses' in data and data['expenses']:
-            doc.add_heading('EXPENSES', level=1)
-            table = doc.add_table(rows=1, cols=4)
-            table.style = 'Table Grid'
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = 'Name'
-            hdr_cells[1].text = 'Date'
-            hdr_cells[2].text = 'Type'
-            hdr_cells[3].text = 'Amount'
-
-            for e in data['expenses']:
-                row_cells = table.add_row().cells
-                row_cells[0].text = e.get('name', 'N/A')
-                row_cells[1].text = str(e.get('date', 'N/A'))
-                row_cells[2].text = e.get('type', 'N/A')
-                row_cells[3].text = f'${e.get("price", 0)}'
-
-            doc.add_paragraph('')
-
-        if 'transactions' in data and data['transactions']:
-            doc.add_heading('TRANSACTIONS', level=1)
-            table = doc.add_table(rows=1, cols=5)
-            table.style = 'Table Grid'
-            hdr_cells = table.rows[0].cells
-            hdr_cells[0].text = 'ID'
-            hdr_cells[1].text = 'Date'
-            hdr_cells[2].text = 'Type'
-            hdr_cells[3].text = 'Total'
-            hdr_cells[4].text = 'Products'
-
-            for t in data['transactions']:
-                row_cells = table.add_row().cells
-                row_cells[0].text = str(t.get('id', 'N/A'))
-                row_cells[1].text = str(t.get('date', 'N/A'))
-                row_cells[2].text = t.get('type', 'N/A')
-                row_cells[3].text = f'${t.get("total", 0)}'
-                row_cells[4].text = t.get('products', 'N/A')[:30] + '...' if len(str(t.get('products', ''))) > 30 else t.get('products', 'N/A')
-
-        # Save to buffer
-        from io import BytesIO
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-
-        from django.http import HttpResponse
-        response = HttpResponse(buffer.getvalue(), content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-        response['Content-Disposition'] = f'attachment; filename="{filename}.docx"'
-        return response
+
+class ImportData(View):
+    def post(self, request):
+        try:
+            upload = request.FILES['file']
+            kind = request.POST.get('type', request.GET.get('type', ''))
+            batch_size = int(request.POST.get('batch_size', DEFAULT_BATCH_SIZE))
+
+            lines = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            report = import_csv(lines, kind, batch_size)
+            report['errors'] = report['errors'][:MAX_REPORTED_ERRORS]
+
+            status = 400 if report['error_count'] and not report['imported'] else 201
+            return JsonResponse(report, status=status)
+        except KeyError as e:
+            return JsonResponse({'error': f'Missing field: {str(e)}'}, status=400)
+        except (ValueError, UnicodeDecodeError) as e:
+            return JsonResponse({'error': f'Invalid import: {e}'}, status=400)
+        except Exception as e:
+            return JsonResponse({'error': f'Internal Server Error:{e}'}, status=500)
@@ -2,10 +2,13 @@
 """Django's command-line utility for administrative tasks."""
 import os
 import sys
+import time
 
 
 def main():
     """Run administrative tasks."""
+    # Lets `manage.py serve` report how long imports took before it ran.
+    os.environ.setdefault('DASHBOARD_BOOT_STARTED', str(time.time()))
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AmandaLynnDashboard.settings')
     try:
         from django.core.management import execute_from_command_line
@@ -14,15 +14,17 @@ docker-compose up -d
 
 echo Waiting for Django server...
 
-set "django_url=http://localhost:8000/api/status/"
+set "django_url=http://localhost:8000/api/ready/?wait=60"
 set "app_url=http://localhost:8081"
 set "timeout=5"
 
 :check_django
-powershell -Command "(Invoke-WebRequest -Uri '%django_url%' -UseBasicParsing).StatusCode" >nul 2>&1
+REM The ready endpoint blocks until the backend has finished starting, so we
+REM only need to retry (after a short pause) while the server is not listening.
+powershell -Command "(Invoke-WebRequest -Uri '%django_url%' -UseBasicParsing -TimeoutSec 65).StatusCode" >nul 2>&1
 if errorlevel 1 (
     echo Waiting for Django server to respond...
-    timeout /t %timeout% >nul
+    timeout /t 1 >nul
     goto :check_django
 )
 